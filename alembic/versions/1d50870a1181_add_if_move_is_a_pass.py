@@ -15,8 +15,27 @@ down_revision = '413237fcac5d'
 branch_labels = None
 depends_on = None
 
+BACKFILL_BATCH_SIZE = 10000
+
 def upgrade() -> None:
-    op.add_column('moves', sa.Column('is_pass', sa.Boolean(), nullable=True, server_default='false'))
+    # Add the column without a default so no database rewrites the table
+    op.add_column('moves', sa.Column('is_pass', sa.Boolean(), nullable=True))
+
+    # Backfill existing rows by id range, committing each batch on its own
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT max(id) FROM moves")).scalar() or 0
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(
+                    "UPDATE moves SET is_pass = false "
+                    "WHERE id >= :start AND id < :end AND is_pass IS NULL"
+                ),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+    # Only new inserts need the default from here on
+    op.alter_column('moves', 'is_pass', server_default='false')
 
 def downgrade() -> None:
     op.drop_column('moves', 'is_pass')
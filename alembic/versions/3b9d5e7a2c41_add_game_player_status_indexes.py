@@ -0,0 +1,37 @@
+"""Add game player status indexes
+
+Revision ID: 3b9d5e7a2c41
+Revises: fe1971dd6f10
+Create Date: 2025-04-18 10:12:37.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d5e7a2c41'
+down_revision = 'fe1971dd6f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently so writes to games keep flowing during the deploy
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_game_black_player_status_last_move', 'games',
+            ['black_player_id', 'status', 'last_move_at'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_game_white_player_status_last_move', 'games',
+            ['white_player_id', 'status', 'last_move_at'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_game_white_player_status_last_move', table_name='games', postgresql_concurrently=True)
+        op.drop_index('ix_game_black_player_status_last_move', table_name='games', postgresql_concurrently=True)
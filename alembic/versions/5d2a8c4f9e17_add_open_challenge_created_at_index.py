@@ -0,0 +1,31 @@
+"""Add open challenge created_at index
+
+Revision ID: 5d2a8c4f9e17
+Revises: 3b9d5e7a2c41
+Create Date: 2025-04-19 14:03:21.905317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8c4f9e17'
+down_revision = '3b9d5e7a2c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Partial like ix_challenge_match: the sweep only ever deletes open challenges
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_challenge_open_created_at', 'challenges', ['created_at'],
+            postgresql_where=sa.text("status = 'open'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_challenge_open_created_at', table_name='challenges', postgresql_concurrently=True)
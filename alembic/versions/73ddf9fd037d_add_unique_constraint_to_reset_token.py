@@ -7,6 +7,7 @@ Create Date: 2025-04-03 16:19:27.315197
 """
 from alembic import op
 import sqlalchemy as sa
+import time
 
 
 # revision identifiers, used by Alembic.
@@ -15,16 +16,29 @@ down_revision = 'ca15420ecc46'
 branch_labels = None
 depends_on = None
 
+RESET_TOKEN_BATCH_SIZE = 1000
+
 
 def upgrade():
-    # First, ensure all existing reset_tokens are NULL or unique
-    op.execute("UPDATE users SET reset_token = NULL WHERE reset_token IS NOT NULL")
-    
-    # Then add the unique constraint and index
-    op.create_index('idx_reset_token', 'users', ['reset_token'])
-    op.create_unique_constraint('uq_users_reset_token', 'users', ['reset_token'])
+    # Run outside the migration transaction so neither step holds a
+    # long-lived lock on users
+    with op.get_context().autocommit_block():
+        # First, ensure all existing reset_tokens are NULL, in short
+        # batches so each one commits on its own
+        bind = op.get_bind()
+        clear_batch = sa.text(
+            "UPDATE users SET reset_token = NULL WHERE id IN ("
+            "SELECT id FROM users WHERE reset_token IS NOT NULL "
+            "LIMIT :batch_size FOR UPDATE SKIP LOCKED)"
+        )
+        while bind.execute(clear_batch, {"batch_size": RESET_TOKEN_BATCH_SIZE}).rowcount:
+            time.sleep(0.05)  # Let autovacuum keep up with the dead tuples
+
+        # Then build the index without blocking writes and attach it as the
+        # unique constraint. It also serves `reset_token = :t` lookups.
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY uq_users_reset_token ON users (reset_token)")
+    op.execute("ALTER TABLE users ADD CONSTRAINT uq_users_reset_token UNIQUE USING INDEX uq_users_reset_token")
 
 def downgrade():
-    # Remove the constraint and index
+    # Remove the constraint (and its backing index)
     op.drop_constraint('uq_users_reset_token', 'users', type_='unique')
-    op.drop_index('idx_reset_token', 'users')
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""Add game status/last_move_at index
+
+Revision ID: 8a4e1c6b2f93
+Revises: 5d2a8c4f9e17
+Create Date: 2025-04-21 10:37:52.418806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e1c6b2f93'
+down_revision = '5d2a8c4f9e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # cleanup_stale_games filters on status and compares last_move_at
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_game_status_last_move', 'games', ['status', 'last_move_at'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_game_status_last_move', table_name='games', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""Add open challenge indexes
+
+Revision ID: 8e4d2b7f1c3a
+Revises: c64c09a887d4
+Create Date: 2025-04-14 10:12:41.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4d2b7f1c3a'
+down_revision = 'c64c09a887d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Partial indexes over the open challenges used by matchmaking, built
+    # without blocking writes to challenges
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_challenge_open', 'challenges', ['board_size', 'time_control'],
+            postgresql_where=sa.text("status = 'open'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_challenge_open_anon', 'challenges', ['board_size', 'time_control'],
+            postgresql_where=sa.text("status = 'open' AND is_anonymous = true"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_challenge_open_anon', table_name='challenges', postgresql_concurrently=True)
+        op.drop_index('ix_challenge_open', table_name='challenges', postgresql_concurrently=True)
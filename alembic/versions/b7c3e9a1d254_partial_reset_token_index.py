@@ -0,0 +1,41 @@
+"""Replace reset_token unique constraint with a partial unique index
+
+Revision ID: b7c3e9a1d254
+Revises: 8a4e1c6b2f93
+Create Date: 2025-04-22 09:14:05.631820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c3e9a1d254'
+down_revision = '8a4e1c6b2f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only users mid-reset carry a token, so index just those rows. Build it
+    # under a temporary name first so reset_token stays unique throughout.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_users_reset_token_partial "
+            "ON users (reset_token) WHERE reset_token IS NOT NULL"
+        )
+    op.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS uq_users_reset_token")
+    op.execute("DROP INDEX IF EXISTS uq_users_reset_token")
+    op.execute("ALTER INDEX uq_users_reset_token_partial RENAME TO uq_users_reset_token")
+    # Databases migrated before 73ddf9fd037d stopped creating it still carry
+    # this duplicate of the unique index
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_reset_token")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY uq_users_reset_token_full ON users (reset_token)")
+    op.execute("DROP INDEX uq_users_reset_token")
+    op.execute("ALTER INDEX uq_users_reset_token_full RENAME TO uq_users_reset_token")
+    op.execute("ALTER TABLE users ADD CONSTRAINT uq_users_reset_token UNIQUE USING INDEX uq_users_reset_token")
@@ -0,0 +1,31 @@
+"""Add auth_providers user_id index
+
+Revision ID: c2f8a6d4e913
+Revises: b7c3e9a1d254
+Create Date: 2025-04-22 09:31:48.270593
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f8a6d4e913'
+down_revision = 'b7c3e9a1d254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Postgres does not index FK columns; needed for per-user provider lookups
+    # and for RI checks when users rows are deleted
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_auth_providers_user_id "
+            "ON auth_providers (user_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_auth_providers_user_id', table_name='auth_providers', postgresql_concurrently=True)
@@ -0,0 +1,54 @@
+"""Timestamp auth_providers rows on the database side
+
+Revision ID: d9a1b5c7f382
+Revises: c2f8a6d4e913
+Create Date: 2025-04-22 09:52:16.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a1b5c7f382'
+down_revision = 'c2f8a6d4e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing values were written with datetime.utcnow()
+    for column in ('created_at', 'updated_at'):
+        op.alter_column(
+            'auth_providers', column,
+            existing_type=sa.DateTime(),
+            type_=sa.TIMESTAMP(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            server_default=sa.func.now(),
+            existing_nullable=True,
+        )
+
+    # Keep updated_at current on the database side
+    op.execute(
+        "CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$ "
+        "BEGIN NEW.updated_at = now(); RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+    op.execute("DROP TRIGGER IF EXISTS auth_providers_updated_at ON auth_providers")
+    op.execute(
+        "CREATE TRIGGER auth_providers_updated_at BEFORE UPDATE ON auth_providers "
+        "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS auth_providers_updated_at ON auth_providers")
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
+    for column in ('created_at', 'updated_at'):
+        op.alter_column(
+            'auth_providers', column,
+            existing_type=sa.TIMESTAMP(timezone=True),
+            type_=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            server_default=None,
+            existing_nullable=True,
+        )
@@ -0,0 +1,49 @@
+"""Make games.last_move_at NOT NULL
+
+Revision ID: e4b8c2a9d617
+Revises: d9a1b5c7f382
+Create Date: 2025-04-23 11:05:42.118370
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import time
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8c2a9d617'
+down_revision = 'd9a1b5c7f382'
+branch_labels = None
+depends_on = None
+
+LAST_MOVE_AT_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    # The game list pages on (last_move_at, id); legacy rows without a
+    # last_move_at would drop out of it. Each step commits on its own so none
+    # holds a long-lived lock on games.
+    with op.get_context().autocommit_block():
+        # Backfill legacy rows with their creation time, in short batches
+        bind = op.get_bind()
+        backfill_batch = sa.text(
+            "UPDATE games SET last_move_at = COALESCE(created_at, now()) WHERE id IN ("
+            "SELECT id FROM games WHERE last_move_at IS NULL "
+            "LIMIT :batch_size FOR UPDATE SKIP LOCKED)"
+        )
+        while bind.execute(backfill_batch, {"batch_size": LAST_MOVE_AT_BATCH_SIZE}).rowcount:
+            time.sleep(0.05)  # Let autovacuum keep up with the dead tuples
+
+        # A validated CHECK lets SET NOT NULL skip its full-table scan under
+        # ACCESS EXCLUSIVE; VALIDATE only needs SHARE UPDATE EXCLUSIVE
+        op.execute(
+            "ALTER TABLE games ADD CONSTRAINT games_last_move_at_not_null "
+            "CHECK (last_move_at IS NOT NULL) NOT VALID"
+        )
+        op.execute("ALTER TABLE games VALIDATE CONSTRAINT games_last_move_at_not_null")
+        op.alter_column('games', 'last_move_at', existing_type=sa.DateTime(), nullable=False)
+        op.drop_constraint('games_last_move_at_not_null', 'games', type_='check')
+
+
+def downgrade() -> None:
+    op.alter_column('games', 'last_move_at', existing_type=sa.DateTime(), nullable=True)
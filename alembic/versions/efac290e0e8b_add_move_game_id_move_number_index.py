@@ -0,0 +1,30 @@
+"""Add move game_id/move_number index
+
+Revision ID: efac290e0e8b
+Revises: 8e4d2b7f1c3a
+Create Date: 2025-04-14 15:37:02.114953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'efac290e0e8b'
+down_revision = '8e4d2b7f1c3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves per-game move lookups in move order, built without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_move_game_id_move_number', 'moves', ['game_id', 'move_number'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_move_game_id_move_number', table_name='moves', postgresql_concurrently=True)
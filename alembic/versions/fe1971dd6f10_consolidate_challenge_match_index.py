@@ -0,0 +1,44 @@
+"""Consolidate challenge match index
+
+Revision ID: fe1971dd6f10
+Revises: efac290e0e8b
+Create Date: 2025-04-17 09:48:55.271630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fe1971dd6f10'
+down_revision = 'efac290e0e8b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # One partial index over open challenges replaces the two per-path ones.
+    # Build the new one first so matchmaking is never left without an index.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_challenge_match', 'challenges', ['board_size', 'time_control', 'is_anonymous'],
+            postgresql_where=sa.text("status = 'open'"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_challenge_open_anon', table_name='challenges', postgresql_concurrently=True)
+        op.drop_index('ix_challenge_open', table_name='challenges', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_challenge_open', 'challenges', ['board_size', 'time_control'],
+            postgresql_where=sa.text("status = 'open'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_challenge_open_anon', 'challenges', ['board_size', 'time_control'],
+            postgresql_where=sa.text("status = 'open' AND is_anonymous = true"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_challenge_match', table_name='challenges', postgresql_concurrently=True)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import case, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, load_only
 import asyncio
+import hmac
+import itertools
+import secrets
+from typing import Optional
 
-from .database import engine, get_db
+from .database import get_db
 from fastapi.security import OAuth2PasswordRequestForm
 import go_game.models as models
 from .game_logic import GameService, InvalidMoveError, KoViolationError, SuicideMoveError, MoveResultType, MoveResult
@@ -20,12 +26,10 @@ from .schemas import (
     GameHistoryResponse,
     GameSummary,
     WebSocketResponseType,
-    WebSocketResponse,
     DrawOfferRequest,
     DrawOfferResponse,
     DrawAcceptResponse,
     UserInfoResponse,
-    RedisGameUpdate,
     UserCreate,
     MoveResponse,
     GameHistory,
@@ -45,6 +49,7 @@ from .auth import (get_current_user,
                    create_refresh_token, 
                    validate_token, 
                    get_password_hash, 
+                   run_password_hashing,
                    verify_apple_token)
 from .utils.board_visualizer import visualize_game
 from datetime import timedelta, datetime
@@ -59,10 +64,14 @@ from .game_handlers import process_game_move
 from .email_service import send_password_reset_code_email
 import string
 from .scoring_service import scoring_service
+from .config import settings
 
 # Create router instead of app
 router = APIRouter()
 
+# Handles of background tasks started on startup, cancelled on shutdown
+background_task_handles = []
+
 @router.on_event("startup")
 async def startup_event():
     logger.info("Starting API router")
@@ -70,13 +79,18 @@ async def startup_event():
     await redis_manager.connect()
     # Start background tasks
     logger.info("Starting background tasks")
-    asyncio.create_task(cleanup_stale_challenges())
+    background_task_handles.append(asyncio.create_task(cleanup_stale_challenges()))
     #asyncio.create_task(cleanup_stale_games())
     logger.info("API router startup complete")
 
 @router.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down API router")
+    # Stop background tasks before their connections go away
+    for task in background_task_handles:
+        task.cancel()
+    await asyncio.gather(*background_task_handles, return_exceptions=True)
+    background_task_handles.clear()
     # Close Redis connection
     await redis_manager.disconnect()
     logger.info("API router shutdown complete")
@@ -92,7 +106,8 @@ async def login(
     db: Session = Depends(get_db)
 ) -> Token:
     logger.info("Login attempt for user: %s", form_data.username)
-    user = authenticate_user(db, form_data.username, form_data.password)
+    # bcrypt verification is CPU-bound; keep it off the event loop
+    user = await run_password_hashing(authenticate_user, db, form_data.username, form_data.password)
     if not user:
         logger.warning("Failed login attempt for user: %s", form_data.username)
         raise HTTPException(
@@ -108,6 +123,15 @@ async def login(
     logger.info("Successful login for user: %s", user.username)
     return Token(username=user.username, access_token=access_token, refresh_token=refresh_token, token_type="bearer")
 
+def duplicate_user_detail(error: IntegrityError) -> str:
+    """Map a users unique-constraint violation to a client-facing message"""
+    constraint = getattr(getattr(error.orig, "diag", None), "constraint_name", None) or ""
+    if "username" in constraint:
+        return "Username already registered"
+    if "email" in constraint:
+        return "Email already registered"
+    return "Username or email already registered"
+
 @router.post("/register", response_model=Token)
 async def register(
     user_data: UserCreate,
@@ -116,16 +140,18 @@ async def register(
     """Register a new user"""
     logger.info("Registration attempt for user: %s", user_data.username)
     
-    # Check if username already exists
-    if db.query(models.User).filter(models.User.username == user_data.username).first():
+    # Check if username or email already exists in a single query
+    existing = db.query(models.User.username, models.User.email).filter(
+        or_(models.User.username == user_data.username,
+            models.User.email == user_data.email)
+    ).first()
+    if existing and existing.username == user_data.username:
         logger.warning("Registration failed - username already exists: %s", user_data.username)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-        
-    # Check if email already exists
-    if db.query(models.User).filter(models.User.email == user_data.email).first():
+    if existing:
         logger.warning("Registration failed - email already exists: %s", user_data.email)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -133,26 +159,34 @@ async def register(
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await run_password_hashing(get_password_hash, user_data.password)
     db_user = models.User(
         username=user_data.username,
         email=user_data.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError as e:
+        # A concurrent registration took the username or email after the check above
+        db.rollback()
+        logger.warning("Registration failed - duplicate user: %s", user_data.username)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=duplicate_user_detail(e)
+        )
 
     # Generate tokens
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": db_user.username}, 
+        data={"sub": user_data.username}, 
         expires_delta=access_token_expires
     )
-    refresh_token = create_refresh_token(data={"sub": db_user.username})
+    refresh_token = create_refresh_token(data={"sub": user_data.username})
 
     logger.info("Successfully registered user: %s", user_data.username)
-    return Token(access_token=access_token, refresh_token=refresh_token, username=db_user.username, token_type="bearer")
+    return Token(access_token=access_token, refresh_token=refresh_token, username=user_data.username, token_type="bearer")
 
 
 @router.get("/me", response_model=UserInfoResponse)
@@ -168,11 +202,11 @@ async def get_current_user_info(
     )
 
 @router.get("/games/{game_id}/visualize")
-async def visualize_game_state(
+def visualize_game_state(
     game_id: int,
     db: Session = Depends(get_db)
 ):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = db.get(models.Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
@@ -196,25 +230,51 @@ def create_direct_challenge(challenge: DirectChallenge,
     db.refresh(new_game)
     return {"game_id": new_game.id, "status": "challenge_sent"}
 
+def claim_open_challenge(db: Session, *criteria, new_status: str = "matched"):
+    """Atomically move one matching open challenge to new_status.
+
+    Returns the claimed row's (id, challenger_id, board_size, time_control), or
+    None if nothing matched. Rows locked by a concurrent claim are skipped, so no
+    challenge is matched twice.
+    """
+    candidate = select(models.Challenge.id).where(
+        models.Challenge.status == "open", *criteria
+    ).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    return db.execute(
+        update(models.Challenge)
+        .where(models.Challenge.id == candidate)
+        .values(status=new_status)
+        .returning(
+            models.Challenge.id,
+            models.Challenge.challenger_id,
+            models.Challenge.board_size,
+            models.Challenge.time_control,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+
 @router.post("/challenge/open")
-async def create_open_challenge(challenge: OpenChallenge,
+def create_open_challenge(challenge: OpenChallenge,
                           current_user: models.User = Depends(get_current_user),
                           db: Session = Depends(get_db)):
     # First, check for matching open challenges
     logger.info("Creating open challenge for user %d with board size %d and time control %d", 
                 current_user.id, challenge.board_size, challenge.time_control)
-    matching_challenge = db.query(models.Challenge).filter(
-        models.Challenge.status == "open",
+    matching_challenge = claim_open_challenge(
+        db,
         models.Challenge.board_size == challenge.board_size,
         models.Challenge.time_control == challenge.time_control,
         models.Challenge.challenger_id != current_user.id  # Don't match with self
-    ).first()
+    )
     
     if matching_challenge:
         # Create a new game with the matched players
         # Randomly assign black and white players
-        white_player_id = matching_challenge.challenger_id if random.choice([True, False]) else current_user.id
-        black_player_id = current_user.id if white_player_id == matching_challenge.challenger_id else matching_challenge.challenger_id
+        white_player_id, black_player_id = (
+            (matching_challenge.challenger_id, current_user.id)
+            if random.getrandbits(1)
+            else (current_user.id, matching_challenge.challenger_id)
+        )
         new_game = models.Game(
             black_player_id=black_player_id,
             white_player_id=white_player_id,
@@ -222,23 +282,23 @@ async def create_open_challenge(challenge: OpenChallenge,
             time_control=challenge.time_control
         )
         db.add(new_game)
-        matching_challenge.status = "matched"
-        db.commit()
-        db.refresh(new_game)
-        
-        # Notify via Redis about the match
+        # The INSERT returns the new id on flush; read it before commit expires
+        # the object, so no follow-up SELECT is needed
+        db.flush()
+        game_id = new_game.id
         response = OpenChallengeResponse(
             challenge_id=matching_challenge.id,
             status="matched",
-            game_id=new_game.id,
+            game_id=game_id,
             color=StoneColor.WHITE if white_player_id == current_user.id else StoneColor.BLACK
         )
-        redis_message = RedisGameUpdate(
-            game_id=new_game.id,
-            message=response.dict(),
-            source_id=None
-        )
-        await redis_manager.publish(get_challenge_update_channel(), redis_message.dict())
+        db.commit()
+        
+        # Notify via Redis about the match
+        redis_manager.publish_nowait(get_challenge_update_channel(), {
+            "game_id": game_id,
+            "message": response.dict()
+        })
         
         return response
     
@@ -250,35 +310,39 @@ async def create_open_challenge(challenge: OpenChallenge,
         status="open"
     )
     db.add(new_challenge)
+    db.flush()
+    challenge_id = new_challenge.id
     db.commit()
     
     response = OpenChallengeResponse(
-        challenge_id=new_challenge.id,
+        challenge_id=challenge_id,
         status="waiting"
     )
     
     # Notify via Redis about the new challenge
-    redis_message = RedisGameUpdate(
-        game_id=new_challenge.id,
-        message=response.dict(),
-        source_id=None
-    )
-    await redis_manager.publish(get_challenge_update_channel(), redis_message.dict())
+    redis_manager.publish_nowait(get_challenge_update_channel(), {
+        "game_id": challenge_id,
+        "message": response.dict()
+    })
     
     return response
 
 @router.post("/challenge/{challenge_id}/accept")
-async def accept_challenge(challenge_id: int,
+def accept_challenge(challenge_id: int,
                     current_user: models.User = Depends(get_current_user),
                      db: Session = Depends(get_db)):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    # Claim the challenge in the same UPDATE that checks it is still open, so two
+    # players accepting at once cannot both create a game from it
+    challenge = claim_open_challenge(
+        db, models.Challenge.id == challenge_id, new_status="accepted"
+    )
     if not challenge:
-        raise HTTPException(status_code=404, detail="Challenge not found")
-    
-    if challenge.status != "open":
+        # Only the failure path pays for telling "missing" from "already taken"
+        if db.get(models.Challenge, challenge_id) is None:
+            raise HTTPException(status_code=404, detail="Challenge not found")
         raise HTTPException(status_code=400, detail="Challenge is not pending")
     
-    # Create new game and update challenge status
+    # Create new game
     new_game = models.Game(
         black_player_id=challenge.challenger_id,
         white_player_id=current_user.id,
@@ -286,17 +350,17 @@ async def accept_challenge(challenge_id: int,
         time_control=challenge.time_control,
     )
     db.add(new_game)
-    challenge.status = "accepted"
+    db.flush()
+    game_id = new_game.id
     db.commit()
-    db.refresh(new_game)
     
     # Notify via Redis about the acceptance
     response = {
-        "game_id": new_game.id,
+        "game_id": game_id,
         "status": "game_created",
         "challenge_id": challenge_id
     }
-    await redis_manager.publish("challenge_updates", {
+    redis_manager.publish_nowait("challenge_updates", {
         "challenge_id": challenge_id,
         "data": response
     })
@@ -304,86 +368,80 @@ async def accept_challenge(challenge_id: int,
     return response
 
 @router.post("/anonymous/challenge")
-async def create_anonymous_challenge(challenge: AnonymousChallenge, db: Session = Depends(get_db)):
+def create_anonymous_challenge(challenge: AnonymousChallenge, db: Session = Depends(get_db)):
     """Create or accept an anonymous challenge"""
     # First, check for matching open anonymous challenges
-    matching_challenge = db.query(models.Challenge).filter(
-        models.Challenge.status == "open",
+    matching_challenge = claim_open_challenge(
+        db,
         models.Challenge.board_size == challenge.board_size,
         models.Challenge.time_control == challenge.time_control,
         models.Challenge.is_anonymous == True
-    ).first()
+    )
     
     if matching_challenge:
-        # Create anonymous player for challenger
-        anon_player = models.User(
-            username=f"anonymous_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
-            email=f"anon_{datetime.now().strftime('%Y%m%d%H%M%S%f')}@temp.com",
+        # Create the anonymous player and the game in one INSERT ... WITH statement.
+        # Core inserts still fill in the column defaults declared on the models,
+        # which Game has plenty of.
+        tag = secrets.token_hex(8)
+        anon_player = insert(models.User).values(
+            username=f"anonymous_{tag}",
+            email=f"anon_{tag}@temp.com",
             is_anonymous=True
-        )
-        db.add(anon_player)
-        db.commit()
-        db.refresh(anon_player)
+        ).returning(models.User.id).cte("anon_player")
 
-        # Create a new game with the matched players
-        new_game = models.Game(
-            black_player_id=matching_challenge.challenger_id,
-            white_player_id=anon_player.id,
-            board_size=challenge.board_size,
-            time_control=challenge.time_control
-        )
-        db.add(new_game)
-        matching_challenge.status = "matched"
-        db.commit()
-        db.refresh(new_game)
-        
+        new_game = db.execute(
+            insert(models.Game).add_cte(anon_player).values(
+                black_player_id=matching_challenge.challenger_id,
+                white_player_id=select(anon_player.c.id).scalar_subquery(),
+                board_size=challenge.board_size,
+                time_control=challenge.time_control
+            ).returning(models.Game.id, models.Game.white_player_id)
+        ).first()
         response = {
             "game_id": new_game.id,
             "status": "matched",
-            "player_id": anon_player.id,
+            "player_id": new_game.white_player_id,
             "color": "white",
             "challenge_id": matching_challenge.id
         }
+        db.commit()
         
         # Notify via Redis about the match
-        await redis_manager.publish("challenge_updates", {
+        redis_manager.publish_nowait("challenge_updates", {
             "challenge_id": matching_challenge.id,
             "data": response
         })
         
         return response
     
-    # If no match, create anonymous player and new open challenge
-    anon_player = models.User(
-        username=f"anonymous_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
-        email=f"anon_{datetime.now().strftime('%Y%m%d%H%M%S%f')}@temp.com",
+    # If no match, create anonymous player and new open challenge in one statement
+    tag = secrets.token_hex(8)
+    anon_player = insert(models.User).values(
+        username=f"anonymous_{tag}",
+        email=f"anon_{tag}@temp.com",
         is_anonymous=True
-    )
-    db.add(anon_player)
-    db.commit()
-    db.refresh(anon_player)
+    ).returning(models.User.id).cte("anon_player")
 
-    # Create new open challenge
-    new_challenge = models.Challenge(
-        challenger_id=anon_player.id,
-        board_size=challenge.board_size,
-        time_control=challenge.time_control,
-        status="open",
-        is_anonymous=True
-    )
-    db.add(new_challenge)
-    db.commit()
-    
+    new_challenge = db.execute(
+        insert(models.Challenge).add_cte(anon_player).values(
+            challenger_id=select(anon_player.c.id).scalar_subquery(),
+            board_size=challenge.board_size,
+            time_control=challenge.time_control,
+            status="open",
+            is_anonymous=True
+        ).returning(models.Challenge.id, models.Challenge.challenger_id)
+    ).first()
     response = {
         "challenge_id": new_challenge.id,
         "status": "waiting",
-        "player_id": anon_player.id,
+        "player_id": new_challenge.challenger_id,
         "color": "black"
     }
+    db.commit()
     
     # Notify via Redis about the new challenge
-    await redis_manager.publish("challenge_updates", {
-        "challenge_id": new_challenge.id,
+    redis_manager.publish_nowait("challenge_updates", {
+        "challenge_id": response["challenge_id"],
         "data": response
     })
     
@@ -417,17 +475,33 @@ async def make_game_move(
 def get_game_history(game_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     # Check if the user is a player in this game
     print(current_user.id)
-    game = db.query(models.Game).filter(models.Game.id == game_id, (models.Game.black_player_id == current_user.id) | (models.Game.white_player_id == current_user.id)).first()
+    # One SELECT for the game and both player names, instead of loading the full
+    # Game row and then lazy-loading each player
+    black_player = aliased(models.User)
+    white_player = aliased(models.User)
+    game = db.query(
+        models.Game.id,
+        models.Game.board_size,
+        black_player.username.label("black_player_name"),
+        white_player.username.label("white_player_name"),
+    ).join(black_player, black_player.id == models.Game.black_player_id
+    ).join(white_player, white_player.id == models.Game.white_player_id
+    ).filter(models.Game.id == game_id, (models.Game.black_player_id == current_user.id) | (models.Game.white_player_id == current_user.id)).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    moves = db.query(models.Move).filter(models.Move.game_id == game_id).all()
-    move_list = []
-    for move in moves:
-        moves_response = MoveResponse(move_number=move.move_number, x=move.x, y=move.y, color=move.color)
-        move_list.append(moves_response)
+    # Only the four response columns are needed; skip building full Move objects.
+    # The rows come straight from our own tables, so the response models are built
+    # with construct() and validated once by FastAPI against response_model
+    moves = db.query(
+        models.Move.move_number, models.Move.x, models.Move.y, models.Move.color
+    ).filter(models.Move.game_id == game_id).order_by(models.Move.move_number)
+    move_list = [
+        MoveResponse.construct(move_number=move_number, x=x, y=y, color=color)
+        for move_number, x, y, color in moves
+    ]
 
-    return GameHistory(game_id=game.id, moves=move_list, black_player_name=game.black_player.username, white_player_name=game.white_player.username, board_size=game.board_size)
+    return GameHistory.construct(game_id=game.id, moves=move_list, black_player_name=game.black_player_name, white_player_name=game.white_player_name, board_size=game.board_size)
 
 @router.get("/game/{game_id}/state")
 def get_current_game_state(
@@ -436,9 +510,18 @@ def get_current_game_state(
     db: Session = Depends(get_db)
 ) -> GameStateResponse:
     gs = GameService(db)
-    game = gs.get_game(game_id)
-    if not game:
+    # One SELECT for the game plus just the two usernames, rather than
+    # joining in both full User rows
+    black_player = aliased(models.User)
+    white_player = aliased(models.User)
+    row = db.query(
+        models.Game, black_player.username, white_player.username
+    ).join(black_player, black_player.id == models.Game.black_player_id
+    ).join(white_player, white_player.id == models.Game.white_player_id
+    ).filter(models.Game.id == game_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Game not found")
+    game, black_player_name, white_player_name = row
     
     # Verify the user is a player in this game
     if current_user.id not in [game.black_player_id, game.white_player_id]:
@@ -446,13 +529,13 @@ def get_current_game_state(
     game_state = gs.to_response(game)
     
     # Add player names to the response
-    game_state.black_player_name = game.black_player.username
-    game_state.white_player_name = game.white_player.username
+    game_state.black_player_name = black_player_name
+    game_state.white_player_name = white_player_name
     
     return game_state
 
 @router.post("/game/{game_id}/resign")
-async def resign_game(
+def resign_game(
     game_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -478,55 +561,93 @@ async def resign_game(
     logger.info("Game %d: %s player resigned", 
                game_id, "Black" if is_black_player else "White")
                
-    message = WebSocketResponse(
-        type=WebSocketResponseType.RESIGN,
-        data=gs.to_response(game)
-    )
+    # Plain dict in the WebSocketResponse shape; the same dict is broadcast and returned
+    payload = {
+        "type": WebSocketResponseType.RESIGN,
+        "data": gs.to_response(game).dict()
+    }
 
     # Broadcast via Redis
     logger.debug("Broadcasting resignation for game %d via Redis", game_id)
-    await redis_manager.publish(get_game_update_channel(game_id), {
+    redis_manager.publish_nowait(get_game_update_channel(game_id), {
         "game_id": game.id,
-        "message": message.dict()
+        "message": payload
     })
     
-    return message.dict()
+    return payload
+
+def format_game_cursor(last_move_at: datetime, game_id: int) -> str:
+    """Encode a game list position as `<last_move_at ISO>_<game id>`"""
+    return f"{last_move_at.isoformat()}_{game_id}"
+
+def parse_game_cursor(cursor: str):
+    """Decode a cursor from format_game_cursor, rejecting anything else with 400"""
+    try:
+        timestamp, game_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(timestamp), int(game_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/games", response_model=GameHistoryResponse)
 def get_games(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None
 ):
     # Find all games where the user is a player
-    query = db.query(models.Game).filter(
+    filters = (
         (models.Game.black_player_id == current_user.id) | 
         (models.Game.white_player_id == current_user.id),
         models.Game.status != GameStatus.ACTIVE
-    ).order_by(models.Game.last_move_at.desc())
+    )
     
-    # Get total count for pagination
-    total_count = query.count()
+    # Total count for pagination, only on the first page; later pages are
+    # seeked by cursor and shouldn't pay for a full count each time
+    total_count = None
+    if cursor is None:
+        total_count = db.query(func.count(models.Game.id)).filter(*filters).scalar()
+
+    # Keyset pagination: with a cursor (the previous page's next_cursor) the
+    # index seeks straight to the page instead of walking past `skip` rows.
+    # The id breaks ties between games finished at the same moment.
+    page_filters = filters
+    if cursor is not None:
+        cursor_ts, cursor_id = parse_game_cursor(cursor)
+        page_filters = (*filters, tuple_(models.Game.last_move_at, models.Game.id) < (cursor_ts, cursor_id))
+        skip = 0
     
-    # Apply pagination
-    games = query.offset(skip).limit(limit).all()
+    # Apply pagination, joining only the opponent's username rather than
+    # loading both players and the whole game row
+    opponent = aliased(models.User)
+    games = db.query(
+        models.Game.id,
+        models.Game.created_at,
+        models.Game.board_size,
+        models.Game.black_points,
+        models.Game.white_points,
+        models.Game.last_move_at,
+        opponent.username.label("opponent_name"),
+    ).join(opponent, opponent.id == case(
+        (models.Game.black_player_id == current_user.id, models.Game.white_player_id),
+        else_=models.Game.black_player_id,
+    )).filter(*page_filters).order_by(
+        models.Game.last_move_at.desc(), models.Game.id.desc()
+    ).offset(skip).limit(limit).all()
     
     # Convert games to response format
     games_response = []
     for game in games:
-        # Determine opponent (the other player)
-        opponent_id = game.white_player_id if game.black_player_id == current_user.id else game.black_player_id
-        opponent = db.query(models.User).filter(models.User.id == opponent_id).first()
-        
         # Format score string
         score = f"B+{game.black_points}" if game.black_points > game.white_points else f"W+{game.white_points}"
         
         result = "win" if game.black_points > game.white_points else "loss" if game.black_points < game.white_points else "draw"
 
-        game_history_info = GameSummary(
+        # Trusted DB values; FastAPI validates the whole response once
+        game_history_info = GameSummary.construct(
             id=game.id,
-            opponent=opponent.username,
+            opponent=game.opponent_name,
             date=game.created_at,
             result=result,
             board_size=game.board_size,
@@ -534,15 +655,17 @@ def get_games(
         )
         games_response.append(game_history_info)
         
-    return GameHistoryResponse(games=games_response, count=total_count)
+    # A short page means there is nothing after it
+    next_cursor = format_game_cursor(games[-1].last_move_at, games[-1].id) if len(games) == limit else None
+    return GameHistoryResponse.construct(games=games_response, count=total_count, next_cursor=next_cursor)
 
 @router.post("/game/{game_id}/offer_draw")
-async def offer_draw(
+def offer_draw(
     game_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> DrawOfferResponse:
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = db.get(models.Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
@@ -556,18 +679,16 @@ async def offer_draw(
     
     # Notify the other player via Redis
     gs = GameService(db)
-    message = WebSocketResponse(
-        type=WebSocketResponseType.DRAW_OFFER,
-        data=gs.to_response(game)
-    )
+    message = {
+        "type": WebSocketResponseType.DRAW_OFFER,
+        "data": gs.to_response(game).dict()
+    }
 
-    redis_message = RedisGameUpdate(
-        game_id=game.id,
-        message=message.dict(),
-        target_id=game.white_player_id if current_user.id == game.black_player_id else game.black_player_id
-    )
-    
-    await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+    redis_manager.publish_nowait(get_game_update_channel(game_id), {
+        "game_id": game.id,
+        "message": message,
+        "target_id": game.white_player_id if current_user.id == game.black_player_id else game.black_player_id
+    })
     
     return DrawOfferResponse(
         status="success",
@@ -575,12 +696,12 @@ async def offer_draw(
     )
 
 @router.post("/game/{game_id}/accept_draw")
-async def accept_draw(
+def accept_draw(
     game_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> DrawAcceptResponse:
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = db.get(models.Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
@@ -597,14 +718,14 @@ async def accept_draw(
     
     # Notify both players via Redis
     gs = GameService(db)
-    message = WebSocketResponse(
-        type=WebSocketResponseType.DRAW_ACCEPTED,
-        data=gs.to_response(game)
-    )
+    message = {
+        "type": WebSocketResponseType.DRAW_ACCEPTED,
+        "data": gs.to_response(game).dict()
+    }
     
-    await redis_manager.publish(get_game_update_channel(game_id), {
+    redis_manager.publish_nowait(get_game_update_channel(game_id), {
         "game_id": game_id,
-        "message": message.dict()
+        "message": message
     })
     
     return DrawAcceptResponse(
@@ -696,7 +817,10 @@ async def get_scoring_status(
     db: Session = Depends(get_db)
 ) -> ScoringStatus:
     """Get the current scoring status for a game"""
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    # Only the player ids are needed; skip the board and move-history columns
+    game = db.get(models.Game, game_id, options=[
+        load_only(models.Game.black_player_id, models.Game.white_player_id)
+    ])
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
@@ -710,7 +834,7 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 @router.post("/token/refresh")
-async def refresh_token(
+def refresh_token(
     request: RefreshTokenRequest,
     db: Session = Depends(get_db)
 ) -> Token:
@@ -762,7 +886,47 @@ async def refresh_token(
 import random
 import string
 
-@router.post("/forgot-password/request")
+RESET_CODE_ALPHABET = string.digits + string.ascii_uppercase
+
+def get_client_ip(http_request: Request) -> str:
+    """The caller's address, as recorded by the proxies in front of the app.
+
+    Each trusted proxy appends the address it saw to X-Forwarded-For, so the
+    entry TRUSTED_PROXY_HOPS from the right is the real client; anything left
+    of it was supplied by the client and can be forged.
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    forwarded_for = http_request.headers.get("x-forwarded-for")
+    if hops and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(",")]
+        return addresses[max(len(addresses) - hops, 0)]
+    return http_request.client.host if http_request.client else "unknown"
+
+async def limit_password_reset_attempts(http_request: Request):
+    """Reject a client with 429 once it exceeds the password reset attempt budget for an email"""
+    client_ip = get_client_ip(http_request)
+    # FastAPI has already read and cached the body for the endpoint's model
+    try:
+        body = await http_request.json()
+        email = str(body.get("email", "")).strip().lower()
+    except (ValueError, AttributeError):
+        email = ""
+    try:
+        attempts = await redis_manager.incr(
+            f"rate:password_reset:{client_ip}:{email}", ex=settings.PASSWORD_RESET_RATE_WINDOW
+        )
+    except Exception as e:
+        # Fail open: a Redis outage shouldn't take password reset down with it
+        logger.error("Password reset rate limit unavailable, allowing request: %s", e)
+        return
+    if attempts > settings.PASSWORD_RESET_RATE_LIMIT:
+        logger.warning("Password reset rate limit exceeded for %s (%s)", client_ip, email)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many password reset attempts, please try again later"
+        )
+
+@router.post("/forgot-password/request", dependencies=[Depends(limit_password_reset_attempts)])
 async def request_password_reset(
     request: PasswordResetRequest,
     db: Session = Depends(get_db)
@@ -777,7 +941,8 @@ async def request_password_reset(
         return {"status": "success", "message": "If your email is registered, you will receive a password reset code"}
     
     # Generate a more secure 8-character alphanumeric code
-    reset_code = ''.join(random.choices(string.digits + string.ascii_uppercase, k=8))
+    # secrets, not random: the Mersenne Twister output can be predicted from earlier codes
+    reset_code = ''.join(secrets.choice(RESET_CODE_ALPHABET) for _ in range(8))
     token_expiry = datetime.utcnow() + timedelta(hours=1)  # Shorter expiry for codes
     
     # Store the code in the database
@@ -791,20 +956,25 @@ async def request_password_reset(
     logger.info(f"Password reset code sent to: {user.email}")
     return {"status": "success", "message": "If your email is registered, you will receive a password reset code"}
 
-@router.post("/forgot-password/reset")
+@router.post("/forgot-password/reset", dependencies=[Depends(limit_password_reset_attempts)])
 async def verify_reset_code(
     request: PasswordResetWithCode,
     db: Session = Depends(get_db)
 ):
     """Verify reset code and set new password"""
-    # Find user with this email and code
-    user = db.query(models.User).filter(
-        models.User.email == request.email,
-        models.User.reset_token == request.reset_code
-    ).first()
+    # Look up by email only and compare the code in constant time, so response
+    # timing does not reveal how much of a guessed code matched
+    user = db.query(models.User).filter(models.User.email == request.email).first()
+    if user is None:
+        hmac.compare_digest(b"x" * 8, request.reset_code.encode())
+    code_ok = bool(
+        user
+        and user.reset_token
+        and hmac.compare_digest(user.reset_token.encode(), request.reset_code.encode())
+    )
     
     # Check if code exists and is valid
-    if not user or not user.reset_token_expires or user.reset_token_expires < datetime.utcnow():
+    if not code_ok or not user.reset_token_expires or user.reset_token_expires < datetime.utcnow():
         logger.warning(f"Invalid or expired password reset code used")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -812,7 +982,7 @@ async def verify_reset_code(
         )
     
     # Update the password
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await run_password_hashing(get_password_hash, request.new_password)
     
     # Clear the reset code
     user.reset_token = None
@@ -824,7 +994,7 @@ async def verify_reset_code(
     return {"status": "success", "message": "Password has been reset successfully"}
 
 @router.post("/auth/apple", response_model=Token)
-async def login_with_apple(
+def login_with_apple(
     apple_data: AppleLoginRequest,
     db: Session = Depends(get_db)
 ) -> Token:
@@ -870,7 +1040,7 @@ async def login_with_apple(
         
         if auth_provider:
             # User exists, retrieve and return tokens
-            user = db.query(models.User).filter(models.User.id == auth_provider.user_id).first()
+            user = db.get(models.User, auth_provider.user_id)
             logger.info("Existing Apple user found: %s", user.username)
             
             # Update provider email if it changed (Apple relay emails can change)
@@ -905,36 +1075,54 @@ async def login_with_apple(
                 
                 # Generate a unique username
                 base_username = full_name.split()[0].lower() if full_name else apple_email.split('@')[0]
-                username = base_username
                 
-                # Ensure username is unique
-                counter = 1
-                while db.query(models.User).filter(models.User.username == username).first():
-                    username = f"{base_username}{counter}"
-                    counter += 1
-                
-                # Create the user
-                user = models.User(
-                    username=username,
-                    email=apple_email,
-                    hashed_password=None,
-                    role=models.UserRole.USER
-                )
-                db.add(user)
-                db.commit()
-                db.refresh(user)
+                # Ensure username is unique: fetch every taken variant in one
+                # query and pick the first free suffix locally
+                taken = {
+                    row.username for row in db.query(models.User.username).filter(
+                        models.User.username.startswith(base_username, autoescape=True)
+                    )
+                }
+                username = base_username
+                if username in taken:
+                    username = next(
+                        f"{base_username}{n}" for n in itertools.count(1)
+                        if f"{base_username}{n}" not in taken
+                    )
                 
-                # Create the auth provider link
-                auth_provider = models.AuthProvider(
-                    user_id=user.id,
-                    provider=AuthProviderType.APPLE,
-                    provider_user_id=apple_user_id,
-                    provider_email=apple_email
-                )
-                db.add(auth_provider)
-                db.commit()
+                try:
+                    # Create the user
+                    user = models.User(
+                        username=username,
+                        email=apple_email,
+                        hashed_password=None,
+                        role=models.UserRole.USER
+                    )
+                    db.add(user)
+                    # Flush for user.id; the user and its provider link commit together
+                    db.flush()
+                    
+                    # Create the auth provider link
+                    auth_provider = models.AuthProvider(
+                        user_id=user.id,
+                        provider=AuthProviderType.APPLE,
+                        provider_user_id=apple_user_id,
+                        provider_email=apple_email
+                    )
+                    db.add(auth_provider)
+                    db.commit()
+                except IntegrityError:
+                    # A concurrent sign-in with the same Apple ID got there first
+                    db.rollback()
+                    auth_provider = db.query(models.AuthProvider).filter(
+                        models.AuthProvider.provider == AuthProviderType.APPLE,
+                        models.AuthProvider.provider_user_id == apple_user_id
+                    ).first()
+                    if not auth_provider:
+                        raise
+                    user = db.get(models.User, auth_provider.user_id)
                 
-                logger.info("Created new user from Apple login: %s", username)
+                logger.info("Created new user from Apple login: %s", user.username)
         
         # Generate tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -1,5 +1,6 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 import jwt
@@ -8,12 +9,19 @@ from .database import get_db
 from . import models
 from pydantic import BaseModel
 from typing import Union, List, Dict, Optional, Tuple
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from dotenv import load_dotenv
 import os
 from functools import wraps
+import asyncio
 import json
+import re
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
 from .config import settings
 from .schemas import Token, TokenData, User, UserInDB
 
@@ -25,11 +33,34 @@ if not SECRET_KEY:
     raise ValueError("No SECRET_KEY set in environment variables")
 
 ALGORITHM = "HS256"
+JWT_ALGORITHMS = (ALGORITHM,)
+# One codec for all our own tokens, with its options set once instead of being
+# merged into the defaults on every decode. Every token we issue has exp and sub.
+_jwt_codec = jwt.PyJWT(options={"require": ["exp", "sub"]})
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+ACCESS_TOKEN_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+REFRESH_TOKEN_EXPIRE_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 86400
 
 APPLE_PUBLIC_KEYS_URL = "https://appleid.apple.com/auth/keys"
 APPLE_CLIENT_ID = settings.APPLE_CLIENT_ID
+APPLE_PUBLIC_KEYS_TTL = 3600  # seconds, used when Apple sends no max-age
+
+# Shared session keeps the TLS connection to Apple alive between logins. A
+# couple of quick retries ride out a dropped keep-alive connection or a
+# transient 5xx instead of failing the sign-in.
+_apple_http = requests.Session()
+_apple_http.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504)),
+))
+# Parsed public keys by kid, kept until Apple's Cache-Control max-age runs out
+_apple_keys_cache = {"expires_at": 0.0, "fetched_at": 0.0, "keys_by_kid": None}
+# An unknown kid forces a refetch (Apple rotated its keys), but at most this
+# often, so tokens with made-up kids cannot make us hammer Apple
+APPLE_KEYS_MIN_REFRESH_INTERVAL = 60  # seconds
+_apple_keys_lock = threading.Lock()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -39,22 +70,73 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
+# Raw token -> validated payload. The signature check and JSON parse give the
+# same answer every time, so only the expiry has to be re-checked on a hit.
+VALIDATED_TOKEN_CACHE_TTL = 300  # seconds
+# Our tokens are a few hundred bytes; anything far larger is not one of ours
+MAX_TOKEN_LENGTH = 4096
+_validated_token_cache = TTLCache(maxsize=50_000, ttl=VALIDATED_TOKEN_CACHE_TTL)
+_validated_token_cache_lock = threading.Lock()
+
 def validate_token(token: str) -> dict:
     """Core token validation logic, returns payload with username and token type"""
+    with _validated_token_cache_lock:
+        cached = _validated_token_cache.get(token)
+        if cached is not None and cached["exp"] is not None and cached["exp"] <= time.time():
+            # Expired: drop it now rather than holding it until the TTL runs out,
+            # and let jwt.decode raise the usual error below
+            del _validated_token_cache[token]
+            cached = None
+    if cached is not None:
+        return cached
+
+    # Reject anything that is not even shaped like a JWT before paying for the
+    # decode; PyJWT itself already refuses other algs (e.g. "none") before the HMAC
+    if len(token) > MAX_TOKEN_LENGTH or token.count(".") != 2:
+        raise credentials_exception
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _jwt_codec.decode(token, SECRET_KEY, algorithms=JWT_ALGORITHMS)
         username: str = payload.get("sub")
         token_type: str = payload.get("type", "access")  # Default to access for backward compatibility
         if username is None:
             raise credentials_exception
-        return {"username": username, "type": token_type}
+        result = {"username": username, "type": token_type, "exp": payload.get("exp")}
     except PyJWTError:
         raise credentials_exception
 
-async def get_current_user(
+    with _validated_token_cache_lock:
+        _validated_token_cache[token] = result
+    return result
+
+# Access token -> (user id, token exp). Lets repeat requests skip the JWT
+# verify and username lookup and load the user by primary key instead.
+USER_CACHE_TTL = 30  # seconds
+_user_id_cache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+_user_id_cache_lock = threading.Lock()
+
+def _get_cached_user(token: str, db: Session) -> Optional[models.User]:
+    """Load the user for an already-verified access token by primary key"""
+    with _user_id_cache_lock:
+        cached = _user_id_cache.get(token)
+    if cached is not None and (cached[1] is None or cached[1] > time.time()):
+        return db.get(models.User, cached[0])
+    return None
+
+def _cache_user(token: str, user: models.User, payload: dict):
+    with _user_id_cache_lock:
+        _user_id_cache[token] = (user.id, payload["exp"])
+
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> models.User:
+    # Plain def so FastAPI runs the user lookup in its threadpool rather
+    # than blocking the event loop
+    user = _get_cached_user(token, db)
+    if user is not None:
+        return user
+
     payload = validate_token(token)
     username = payload["username"]
     # Only allow access tokens for API authentication
@@ -67,17 +149,38 @@ async def get_current_user(
     user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
+    _cache_user(token, user, payload)
     return user
 
 async def get_current_user_ws(token: bytes, db: Session) -> models.User:
-    payload = validate_token(token.decode())
+    token = token.decode()
+    # Clients reconnecting with the same token share the API cache
+    user = _get_cached_user(token, db)
+    if user is not None:
+        return user
+
+    payload = validate_token(token)
     username = payload["username"]
     user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
+    # Only access tokens go in the cache, so a hit never upgrades another token type
+    if payload["type"] == "access":
+        _cache_user(token, user, payload)
     return user
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt_sha256 pre-hashes with SHA-256 and base64 before bcrypt, so passwords
+# longer than 72 bytes are no longer silently truncated. Plain bcrypt stays
+# listed so existing hashes still verify. Pinning min/max rounds to the
+# configured cost makes any hash at a different cost count as outdated, so
+# changing BCRYPT_COST takes effect as users log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256", "bcrypt"],
+    deprecated="auto",
+    bcrypt_sha256__rounds=settings.BCRYPT_COST,
+    bcrypt_sha256__min_rounds=settings.BCRYPT_COST,
+    bcrypt_sha256__max_rounds=settings.BCRYPT_COST,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -87,21 +190,56 @@ def verify_password(plain_password, hashed_password):
 
 def get_password_hash(password):
     return pwd_context.hash(password)
+
+# Created lazily so it binds to the running event loop
+_password_hash_semaphore: Optional[asyncio.Semaphore] = None
+
+async def run_password_hashing(func, *args):
+    """Run a bcrypt hash or verify in a worker thread, capping how many run at once"""
+    global _password_hash_semaphore
+    if _password_hash_semaphore is None:
+        _password_hash_semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_CONCURRENCY)
+    async with _password_hash_semaphore:
+        return await asyncio.to_thread(func, *args)
+
+# Tokens minted for the same subject within this window are reused, so bursts
+# of logins don't re-sign a JWT each time. exp moves back by at most this much.
+TOKEN_CACHE_TTL = 15  # seconds
+_token_cache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+def _cached_token(key: tuple, mint) -> str:
+    with _token_cache_lock:
+        token = _token_cache.get(key)
+    if token is None:
+        token = mint()
+        with _token_cache_lock:
+            _token_cache[key] = token
+    return token
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
+    if data.keys() == {"sub"}:
+        return _cached_token(("access", data["sub"], expires_delta),
+                             lambda: _encode_access_token(data, expires_delta))
+    return _encode_access_token(data, expires_delta)
+
+def _encode_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # exp as integer epoch seconds, which is what PyJWT would turn a datetime into
+    lifetime = int(expires_delta.total_seconds()) if expires_delta else ACCESS_TOKEN_EXPIRE_SECONDS
+    to_encode.update({"exp": int(time.time()) + lifetime, "type": "access"})
+    encoded_jwt = _jwt_codec.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
+    if data.keys() == {"sub"}:
+        return _cached_token(("refresh", data["sub"]), lambda: _encode_refresh_token(data))
+    return _encode_refresh_token(data)
+
+def _encode_refresh_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": int(time.time()) + REFRESH_TOKEN_EXPIRE_SECONDS, "type": "refresh"})
+    encoded_jwt = _jwt_codec.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def get_user(db, username: str):
@@ -110,11 +248,28 @@ def get_user(db, username: str):
         return UserInDB(**user_dict)
     
 def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
+    """Check a username/password pair.
+
+    Returns a (id, username, hashed_password) row rather than a full User;
+    login only needs the username, so skip loading and tracking the rest.
+    """
+    user = db.query(
+        models.User.id, models.User.username, models.User.hashed_password
+    ).filter(models.User.username == username).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # One verify also reports whether the stored hash is outdated (plain bcrypt,
+    # or a cost other than BCRYPT_COST); the password is at hand, so rehash now
+    verified, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        db.execute(
+            update(models.User)
+            .where(models.User.id == user.id)
+            .values(hashed_password=new_hash)
+        )
+        db.commit()
     return user
 
 def check_permissions(allowed_roles: List[str]):
@@ -130,14 +285,50 @@ def check_permissions(allowed_roles: List[str]):
         return wrapper
     return decorator
 
-def get_apple_public_keys() -> Dict:
-    """Fetch Apple's public keys for token verification"""
-    try:
-        response = requests.get(APPLE_PUBLIC_KEYS_URL)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        raise ValueError(f"Failed to fetch Apple public keys: {str(e)}")
+def _cache_max_age(cache_control: Optional[str]) -> int:
+    """Seconds allowed by a Cache-Control header, or the default TTL without one"""
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else APPLE_PUBLIC_KEYS_TTL
+
+def _cached_apple_keys(force_refresh: bool) -> Optional[Dict]:
+    """The cached key map if it is still usable, else None"""
+    if _apple_keys_cache["keys_by_kid"] is None:
+        return None
+    now = time.monotonic()
+    if force_refresh:
+        fresh_enough = now - _apple_keys_cache["fetched_at"] < APPLE_KEYS_MIN_REFRESH_INTERVAL
+    else:
+        fresh_enough = now < _apple_keys_cache["expires_at"]
+    return _apple_keys_cache["keys_by_kid"] if fresh_enough else None
+
+def get_apple_public_keys(force_refresh: bool = False) -> Dict:
+    """Fetch Apple's public keys for token verification, parsed and keyed by kid"""
+    keys_by_kid = _cached_apple_keys(force_refresh)
+    if keys_by_kid is not None:
+        return keys_by_kid
+    # Sign-ins run in the threadpool; when the cache runs out, let one thread
+    # fetch while the rest wait for its result instead of all calling Apple
+    with _apple_keys_lock:
+        keys_by_kid = _cached_apple_keys(force_refresh)
+        if keys_by_kid is not None:
+            return keys_by_kid
+        try:
+            response = _apple_http.get(APPLE_PUBLIC_KEYS_URL, timeout=(2, 4))
+            response.raise_for_status()
+            keys = response.json()
+        except requests.RequestException as e:
+            raise ValueError(f"Failed to fetch Apple public keys: {str(e)}")
+        # Parse each JWK once per fetch rather than on every sign-in
+        keys_by_kid = {
+            key["kid"]: jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+            for key in keys.get('keys', [])
+            if key.get('kid')
+        }
+        now = time.monotonic()
+        _apple_keys_cache["keys_by_kid"] = keys_by_kid
+        _apple_keys_cache["fetched_at"] = now
+        _apple_keys_cache["expires_at"] = now + _cache_max_age(response.headers.get("Cache-Control"))
+        return keys_by_kid
 
 def verify_apple_token(identity_token: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
     """
@@ -167,12 +358,10 @@ def verify_apple_token(identity_token: str) -> Tuple[bool, Optional[Dict], Optio
             return False, None, "No key ID found in token header"
         
         # Find the matching public key
-        public_key = None
-        for key in apple_keys.get('keys', []):
-            if key.get('kid') == kid:
-                # Convert JWK to PEM format
-                public_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
-                break
+        public_key = apple_keys.get(kid)
+        if not public_key:
+            # Apple may have rotated its keys since our copy was fetched
+            public_key = get_apple_public_keys(force_refresh=True).get(kid)
         
         if not public_key:
             return False, None, "No matching public key found"
@@ -1,7 +1,7 @@
 import asyncio
 import websockets
-import requests
-import json
+import httpx
+import orjson
 import random
 from datetime import datetime
 import sys
@@ -9,6 +9,7 @@ import argparse
 
 BLACK = 1
 WHITE = 2
+BOARD_GLYPHS = {BLACK: "B ", WHITE: "W "}
 STAGING_URL = "go-backend-124a4c405325.herokuapp.com"
 STAGING_HTTP_PROTOCOL = "https"
 STAGING_WS_PROTOCOL = "wss"
@@ -22,30 +23,42 @@ class AutoPlayer:
         self.base_url = base_url
         self.token = None
         self.board = None
+        # Empty cells kept in step with the board: a list for random.choice plus
+        # each cell's index in it, so cells are added and removed in O(1)
+        self._empty_cells = []
+        self._empty_index = {}
         self.board_size = 7  # MINI board
+        # print_board's header and row labels only depend on the board size
+        self._col_header = "  " + " ".join(str(i).rjust(2) for i in range(self.board_size))
+        self._row_prefixes = [str(y).rjust(2) + " " for y in range(self.board_size)]
         self.my_color = None
         self.game_id = None
         self.port = 8080
         self.http_protocol = http_protocol
         self.ws_protocol = ws_protocol
+        # One async client for the player's lifetime: HTTP calls no longer block
+        # the websocket loop, and the connection is reused between moves
+        self.http = httpx.AsyncClient(base_url=f"{http_protocol}://{base_url}")
+
+    async def close(self):
+        await self.http.aclose()
         
-    def login(self, username, password):
-        response = requests.post(
-            f"{self.http_protocol}://{self.base_url}/token",
+    async def login(self, username, password):
+        response = await self.http.post(
+            "/token",
             data={"username": username, "password": password}
         )
         if response.status_code == 200:
             self.token = response.json()["access_token"]
+            self.http.headers["Authorization"] = f"Bearer {self.token}"
             print(f"Logged in successfully as {username}")
             return True
         print(f"Login failed: {response.text}")
         return False
     
-    def create_challenge(self):
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.post(
-            f"{self.http_protocol}://{self.base_url}/challenge/open",
-            headers=headers,
+    async def create_challenge(self):
+        response = await self.http.post(
+            "/challenge/open",
             json={
                 "boardSize": self.board_size,
                 "timeControl": 300  # BLITZ (5 minutes)
@@ -65,11 +78,9 @@ class AutoPlayer:
         print(f"Failed to create challenge: {response.text}")
         return False
     
-    def make_move(self, x, y):
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.post(
-            f"{self.http_protocol}://{self.base_url}/game/{self.game_id}/move",
-            headers=headers,
+    async def make_move(self, x, y):
+        response = await self.http.post(
+            f"/game/{self.game_id}/move",
             json={"x": x, "y": y}
         )
         if response.status_code == 200:
@@ -85,26 +96,53 @@ class AutoPlayer:
         print("board:")
         print(self.board)
         
-        print("\n  " + " ".join([str(i).rjust(2) for i in range(self.board_size)]))
-        for y in range(self.board_size):
-            row = str(y).rjust(2) + " "
-            for x in range(self.board_size):
-                if self.board[y][x] == 1:
-                    row += "B "
-                elif self.board[y][x] == 2:
-                    row += "W "
-                else:
-                    row += ". "
-            print(row)
+        # Build each row with one join and print the whole board at once
+        lines = ["\n" + self._col_header]
+        for prefix, cells in zip(self._row_prefixes, self.board):
+            lines.append(prefix + "".join([BOARD_GLYPHS.get(cell, ". ") for cell in cells]))
+        print("\n".join(lines))
         print()
     
+    def update_board(self, board):
+        """Store a new board from the server and bring the empty-cell list up to date"""
+        if self.board is None or len(board) != len(self.board):
+            self._empty_cells = [
+                (x, y)
+                for y, row in enumerate(board)
+                for x, cell in enumerate(row)
+                if cell == 0
+            ]
+            self._empty_index = {cell: i for i, cell in enumerate(self._empty_cells)}
+        else:
+            # Only a move's worth of cells change between messages; whole-row
+            # comparison skips the untouched rows without visiting their cells
+            for y, (old_row, new_row) in enumerate(zip(self.board, board)):
+                if old_row == new_row:
+                    continue
+                for x, cell in enumerate(new_row):
+                    if cell == 0:
+                        self._mark_empty((x, y))
+                    else:
+                        self._mark_filled((x, y))
+        self.board = board
+
+    def _mark_empty(self, cell):
+        if cell not in self._empty_index:
+            self._empty_index[cell] = len(self._empty_cells)
+            self._empty_cells.append(cell)
+
+    def _mark_filled(self, cell):
+        i = self._empty_index.pop(cell, None)
+        if i is None:
+            return
+        # Move the last cell into the freed slot so removal stays O(1)
+        last = self._empty_cells.pop()
+        if i < len(self._empty_cells):
+            self._empty_cells[i] = last
+            self._empty_index[last] = i
+
     def find_empty_space(self):
-        empty_spaces = []
-        for y in range(self.board_size):
-            for x in range(self.board_size):
-                if self.board[y][x] == 0:
-                    empty_spaces.append((x, y))
-        return random.choice(empty_spaces) if empty_spaces else None
+        return random.choice(self._empty_cells) if self._empty_cells else None
 
     async def play_game(self, test_disconnect=False, disconnect_after=30, reconnect_after=5):
         """
@@ -122,7 +160,7 @@ class AutoPlayer:
                 
                 while True:
                     message = await websocket.recv()
-                    data = json.loads(message)
+                    data = orjson.loads(message)
                     
                     if data["status"] == "matched":
                         self.game_id = data["game_id"]
@@ -178,7 +216,7 @@ class AutoPlayer:
                                     break  # Exit the websocket context to disconnect
                             
                             message = await websocket.recv()
-                            data = json.loads(message)
+                            data = orjson.loads(message)
                             print(f"Received message: {data['type']}")  # Debug print
                             
                             if data["type"] in ["game_abandoned", "timeout", "resign"]:
@@ -187,7 +225,7 @@ class AutoPlayer:
                                 return  # Exit the function completely
                             
                             if data["type"] in ["game_state", 'move']:
-                                self.board = data["data"]["board"]
+                                self.update_board(data["data"]["board"])
                                 self.print_board()
                                 
                                 # Check if it's our turn
@@ -205,7 +243,7 @@ class AutoPlayer:
                                     move = self.find_empty_space()
                                     if move:
                                         x, y = move
-                                        if self.make_move(x, y):
+                                        if await self.make_move(x, y):
                                             print(f"Made move at ({x}, {y})")
                                         else:
                                             print("Failed to make move, will try another spot next turn")
@@ -257,22 +295,31 @@ async def main():
     else:
         player = AutoPlayer(base_url=DEVELOPMENT_URL, http_protocol=DEVELOPMENT_HTTP_PROTOCOL, ws_protocol=DEVELOPMENT_WS_PROTOCOL)
     
-    # Login
-    if not player.login(args.username, args.password):
-        print("Login failed, exiting")
-        return
-    
-    # Create a challenge
-    if not player.create_challenge():
-        print("Failed to create challenge, exiting")
-        return
-    
-    # Play the game with optional disconnect testing
-    await player.play_game(
-        test_disconnect=args.test_disconnect,
-        disconnect_after=args.disconnect_after,
-        reconnect_after=args.reconnect_after
-    )
+    try:
+        # Login
+        if not await player.login(args.username, args.password):
+            print("Login failed, exiting")
+            return
+        
+        # Create a challenge
+        if not await player.create_challenge():
+            print("Failed to create challenge, exiting")
+            return
+        
+        # Play the game with optional disconnect testing
+        await player.play_game(
+            test_disconnect=args.test_disconnect,
+            disconnect_after=args.disconnect_after,
+            reconnect_after=args.reconnect_after
+        )
+    finally:
+        await player.close()
 
 if __name__ == "__main__":
+    # uvloop is optional; it only speeds up runs with many bots at once
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
@@ -9,10 +9,8 @@ from sqlalchemy.types import Integer
 from .models import Game, GameStatus, TimeControl, StoneColor
 from .websocket_manager import manager
 from .schemas import WebSocketResponse, WebSocketResponseType
-import traceback
-from .event_manager import get_game_update_channel
 from .logging_config import logger
-from sqlalchemy import case
+from sqlalchemy import and_, case, extract, or_
 
 async def cleanup_stale_challenges():
     while True:
@@ -22,13 +20,11 @@ async def cleanup_stale_challenges():
             try:
                 # Delete challenges older than 10 seconds
                 cutoff_time = datetime.now() - timedelta(seconds=10)
-                stale_challenges = db.query(models.Challenge).filter(
+                # One DELETE for the whole set instead of loading and deleting each row
+                db.query(models.Challenge).filter(
                     models.Challenge.created_at < cutoff_time,
                     models.Challenge.status == "open"
-                ).all()
-                
-                for challenge in stale_challenges:
-                    db.delete(challenge)
+                ).delete(synchronize_session=False)
                 
                 db.commit()
             finally:
@@ -36,7 +32,11 @@ async def cleanup_stale_challenges():
         except Exception as e:
             print(f"Error in cleanup task: {e}")  # Consider proper logging
             
-        await asyncio.sleep(30)  # Run cleanup every 30 seconds 
+        try:
+            await asyncio.sleep(30)  # Run cleanup every 30 seconds
+        except asyncio.CancelledError:
+            logger.info("Stale challenge cleanup stopped")
+            raise
 
 async def cleanup_timeout_games(db: Session):
     now = datetime.utcnow()
@@ -57,73 +57,103 @@ async def cleanup_timeout_games(db: Session):
 
     db.commit() 
 
+# Games still on the old format (no clock) are deleted once they are this old
+LEGACY_GAME_MAX_AGE_SECONDS = 604800
+
+async def notify_game_timeout(game_id: int, message: dict):
+    # Sequential per game so the timeout reaches clients before their sockets close
+    await manager.broadcast_to_game(game_id, message)
+    await manager.close_game_connections(game_id)
+
+def end_stale_games(db: Session, now: datetime) -> list:
+    """Time out active games whose player to move has run out of clock.
+
+    black/white_time_remaining hold the time each player has *used*, so the
+    player to move is out of time once used + time since the last move reaches
+    the time control. Legacy games with no clock are deleted after a week.
+    Returns (game_id, timeout message) pairs for the games that timed out;
+    the caller commits.
+    """
+    # Let the database pick the candidates so only games that actually timed
+    # out come back, instead of every active game
+    is_black_turn = models.Game.move_count % 2 == 1
+    time_used = case(
+        (is_black_turn, models.Game.black_time_remaining),
+        else_=models.Game.white_time_remaining,
+    )
+    last_activity = func.coalesce(models.Game.last_move_at, models.Game.created_at)
+    idle_seconds = extract("epoch", now - last_activity)
+    stale_games = db.query(models.Game).filter(
+        models.Game.status == GameStatus.ACTIVE,
+        or_(
+            and_(
+                time_used.is_(None),
+                models.Game.created_at < now - timedelta(seconds=LEGACY_GAME_MAX_AGE_SECONDS),
+            ),
+            and_(
+                models.Game.time_control.isnot(None),
+                time_used + idle_seconds >= models.Game.time_control,
+            ),
+        ),
+    ).all()
+
+    logger.debug(f"Found {len(stale_games)} stale games")
+
+    timed_out = []
+    for game in stale_games:
+        is_black_turn = game.is_black_turn
+        time_used = game.black_time_remaining if is_black_turn else game.white_time_remaining
+        if time_used is None:
+            # Delete game if time_remaining is None (old game format)
+            logger.info(f"Deleting game {game.id}: no clock (old game format)")
+            db.delete(game)
+            continue
+
+        last_activity = game.last_move_at or game.created_at
+        idle_seconds = (now - last_activity).total_seconds()
+        # Same rule as the query, on the loaded row
+        if not game.time_control or time_used + idle_seconds < game.time_control:
+            continue
+
+        logger.info(
+            f"Timing out game {game.id}: used {time_used}s, idle {idle_seconds:.0f}s, "
+            f"time control: {game.time_control}s"
+        )
+        game.status = GameStatus.WHITE_WON_TIMEOUT if is_black_turn else GameStatus.BLACK_WON_TIMEOUT
+        game.winner_id = game.white_player_id if is_black_turn else game.black_player_id
+        game.last_move_at = now
+
+        message = WebSocketResponse(
+            type=WebSocketResponseType.TIMEOUT,
+            data={
+                "timeout_player": StoneColor.BLACK if is_black_turn else StoneColor.WHITE,
+                "status": game.status
+            }
+        )
+        timed_out.append((game.id, message.dict()))
+    return timed_out
+
 async def cleanup_stale_games():
     while True:
         try:
             db = next(get_db())
             try:
-                now = datetime.utcnow()
-                
-                # Find active games
-                time_in_seconds = 0
-                if models.Game.time_control == TimeControl.BLITZ:
-                    time_in_seconds = TimeControl.BLITZ.value
-                elif models.Game.time_control == TimeControl.RAPID:
-                    time_in_seconds = TimeControl.RAPID.value
-                elif models.Game.time_control == TimeControl.NORMAL:
-                    time_in_seconds = TimeControl.NORMAL.value
-                else:
-                    time_in_seconds = 604800  # 7 days for correspondence
-                    
-                active_games = db.query(models.Game).filter(
-                    models.Game.status == GameStatus.ACTIVE,
-                    models.Game.created_at < now - timedelta(seconds=time_in_seconds)
-                ).all()
-
-                logger.debug(f"Found {len(active_games)} active games")
-
-                for game in active_games:
-                    time_since_creation = now - game.created_at
-                    time_since_last_move = now - game.last_move_at if game.last_move_at else time_since_creation
-                    logger.info(
-                        f"Deactivating game {game.id}: created {time_since_creation.total_seconds()/3600:.2f} hours ago, "
-                        f"last move {time_since_last_move.total_seconds()/3600:.1f} hours ago, "
-                        f"time control: {game.time_control} ({time_in_seconds} seconds)"
-                    )
-                    # Get time elapsed since last move
-                    time_since_move = (now - game.last_move_at).total_seconds()
-                    
-                    # Check if current player has run out of time
-                    is_black_turn = game.is_black_turn
-                    time_remaining = game.black_time_remaining if is_black_turn else game.white_time_remaining
-                    if time_remaining is None:
-                        # Delete game if time_remaining is None (old game format)
-                        db.delete(game)
-                        continue
-                    if time_since_move > time_remaining:
-                        game.status = GameStatus.WHITE_WON_TIMEOUT if is_black_turn else GameStatus.BLACK_WON_TIMEOUT
-                        game.winner_id = game.white_player_id if is_black_turn else game.black_player_id
-                        game.last_move_at = now
-                        
-                        try:
-                            message = WebSocketResponse(
-                                type=WebSocketResponseType.TIMEOUT,
-                                data={
-                                    "timeout_player": StoneColor.BLACK if is_black_turn else StoneColor.WHITE,
-                                    "status": game.status
-                                }
-                            )
-                            print(f"Sending timeout message for game {game.id}: {message.dict()}")  # Debug print
-                            await manager.broadcast_to_game(get_game_update_channel(game.id), message.dict())
-                            await manager.close_game_connections(game.id)
-                        except Exception as e:
-                            print(f"Error notifying clients for game {game.id}: {str(e)}")
-                            print(f"Message was: {message.dict() if 'message' in locals() else 'not created'}")
-                            print(f"Traceback: {traceback.format_exc()}")
-
+                timed_out = end_stale_games(db, datetime.utcnow())
                 db.commit()
             finally:
                 db.close()
+
+            # Notify every timed-out game concurrently once the results are saved
+            results = await asyncio.gather(
+                *(notify_game_timeout(game_id, message) for game_id, message in timed_out),
+                return_exceptions=True,
+            )
+            for (game_id, message), result in zip(timed_out, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"Error notifying clients for game {game_id}: {result}; message was: {message}",
+                        exc_info=result,
+                    )
         except Exception as e:
             logger.debug(f"Error in stale games cleanup task: {e}")
 
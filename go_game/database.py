@@ -8,7 +8,16 @@ from .loggers import db_logger as logger
 
 load_dotenv()
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,  # Drop connections that died during a failover before handing them out
+    # Our queries are small; JIT compilation only adds planning latency to them
+    connect_args={"options": "-c jit=off"},
+)
 # Add SQLAlchemy event listeners for logging
 @event.listens_for(engine, "connect")
 def connect(dbapi_connection, connection_record):
@@ -22,6 +31,20 @@ def checkout(dbapi_connection, connection_record, connection_proxy):
 def checkin(dbapi_connection, connection_record):
     logger.debug("Database connection returned to pool")
 
+def warm_up_pool(connections: int = settings.DB_POOL_SIZE):
+    """Open pool connections up front so the first requests don't pay for the connects"""
+    held = []
+    try:
+        for _ in range(connections):
+            held.append(engine.connect())
+    except Exception as e:
+        # The app can still start; the remaining connections open on demand
+        logger.warning("Database pool warm-up stopped after %d connections: %s", len(held), str(e))
+    finally:
+        for conn in held:
+            conn.close()
+    logger.info("Database pool warmed up with %d connections", len(held))
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -1,16 +1,20 @@
 from .config import settings
 from .logging_config import logger
 import redis.asyncio as redis
-from typing import Optional, Any
-import json
+from typing import Optional, Any, Dict, List, Tuple
+import orjson
 import asyncio
 from asyncio import Task
 import uuid
+from functools import lru_cache
+from cachetools import TTLCache
 
+@lru_cache(maxsize=8192)
 def get_game_update_channel(game_id: int) -> str:
     """Get the Redis channel name for game updates"""
     return f"game_updates:{game_id}"
 
+@lru_cache(maxsize=8192)
 def get_game_connection_channel(game_id: int) -> str:
     """Get the Redis channel name for game connection events"""
     return f"game_connections:{game_id}"
@@ -24,73 +28,210 @@ class RedisManager:
     
     def __init__(self, redis_url: str = settings.REDIS_URL):
         self.redis_url = redis_url
+        self.connection_pool: Optional[redis.BlockingConnectionPool] = None
         self.redis_conn: Optional[redis.Redis] = None
         self.pubsub: Optional[redis.client.PubSub] = None
         self.listener_task: Optional[Task] = None
         self.instance_id = str(uuid.uuid4())  # Generate a unique ID for this instance
+        # Fire-and-forget publishes are queued here and sent in pipelined batches
+        self.publish_queue: Optional[asyncio.Queue] = None
+        self.flusher_task: Optional[Task] = None
+        # Loop that owns the queue; sync endpoints running in the threadpool hand
+        # their publishes back to it
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Cluster-wide subscriber counts per channel (PUBSUB NUMSUB), cached briefly
+        self.numsub_cache = TTLCache(maxsize=10_000, ttl=settings.REDIS_NUMSUB_CACHE_TTL)
     
     async def connect(self):
-        """Connect to Redis"""
+        """Connect to Redis; a no-op if already connected.
+
+        Must be awaited at startup: the command methods use the connection
+        without checking for it.
+        """
+        if self.redis_conn is not None:
+            return
         logger.info("Connecting to Redis at %s", self.redis_url)
+        # One bounded pool shared by every publish/get/set in this process,
+        # created on the serving loop (its queue binds to the loop). A blocking
+        # pool makes callers wait for a free connection instead of failing
+        # when all of them are busy.
+        self.connection_pool = redis.BlockingConnectionPool.from_url(
+            self.redis_url, max_connections=settings.REDIS_MAX_CONNECTIONS
+        )
+        self.redis_conn = redis.Redis(connection_pool=self.connection_pool)
         try:
-            self.redis_conn = await redis.from_url(self.redis_url)
+            # Fail fast at startup rather than on the first request
+            await self.redis_conn.ping()
             self.pubsub = self.redis_conn.pubsub()
             self.listener_task = asyncio.create_task(self.pubsub.run())
+            self.loop = asyncio.get_running_loop()
+            self.publish_queue = asyncio.Queue()
+            self.flusher_task = asyncio.create_task(self._flush_publishes())
             logger.info("Successfully connected to Redis")
         except Exception as e:
             logger.error("Failed to connect to Redis: %s", str(e), exc_info=True)
+            self.connection_pool = None
+            self.redis_conn = None
             raise
     
     async def disconnect(self):
-        """Disconnect from Redis"""
+        """Disconnect from Redis; the next connect() starts from scratch"""
         logger.info("Disconnecting from Redis")
         try:
+            if self.flusher_task:
+                self.flusher_task.cancel()
+                await asyncio.gather(self.flusher_task, return_exceptions=True)
+                # Send whatever was still queued before the connection closes
+                pending = []
+                while not self.publish_queue.empty():
+                    pending.append(self.publish_queue.get_nowait())
+                await self.publish_many(pending)
+
             if self.listener_task:
                 self.listener_task.cancel()
             
             if self.pubsub:
                 await self.pubsub.unsubscribe()
                 await self.pubsub.close()
-            
-            if self.redis_conn:
-                await self.redis_conn.close()
+
+            if self.connection_pool:
+                await self.connection_pool.disconnect()
             logger.info("Successfully disconnected from Redis")
         except Exception as e:
             logger.error("Error disconnecting from Redis: %s", str(e), exc_info=True)
+        finally:
+            self.flusher_task = None
+            self.publish_queue = None
+            self.listener_task = None
+            self.pubsub = None
+            self.connection_pool = None
+            self.redis_conn = None
     
-    async def publish(self, channel: str, message: Any):
-        """Publish a message to a Redis channel"""
-        if not self.redis_conn:
-            logger.debug("Redis connection not established, connecting now")
-            await self.connect()
+    async def publish(self, channel: str, message: Any, skip_unwatched: bool = False):
+        """Publish a message to a Redis channel.
 
+        skip_unwatched drops the message when no instance is subscribed. Only
+        pass it for messages a late subscriber can do without, such as full
+        game states that the next state or a move-number ping supersedes:
+        another instance may have subscribed within REDIS_NUMSUB_CACHE_TTL.
+        """
         message["source_id"] = self.instance_id
 
         try:
+            if skip_unwatched and not (await self.subscriber_counts([channel]))[channel]:
+                logger.debug("No subscribers on channel %s, skipping publish", channel)
+                return
             logger.debug(f"Publishing message to channel {channel}: {message}")
-            await self.redis_conn.publish(channel, json.dumps(message))
+            await self.redis_conn.publish(channel, orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS))
             logger.debug("Published message to channel %s", channel)
         except Exception as e:
             logger.error("Failed to publish to Redis channel %s: %s", channel, str(e), exc_info=True)
             raise
     
+    async def subscriber_counts(self, channels) -> Dict[str, int]:
+        """Number of subscribers on each channel across all instances.
+
+        Counts are cached for REDIS_NUMSUB_CACHE_TTL seconds, so a state update
+        for a game nobody is watching skips the PUBLISH round trip. A cached
+        zero can hide a subscriber that joined on another instance since.
+        """
+        counts = {}
+        missing = []
+        for channel in channels:
+            count = self.numsub_cache.get(channel)
+            if count is None:
+                missing.append(channel)
+            else:
+                counts[channel] = count
+        if missing:
+            for name, count in await self.redis_conn.pubsub_numsub(*missing):
+                name = name.decode() if isinstance(name, bytes) else name
+                self.numsub_cache[name] = count
+                counts[name] = count
+        return counts
+
+    def publish_nowait(self, channel: str, message: Any, skip_unwatched: bool = False):
+        """Queue a message for the background flusher instead of awaiting the round trip.
+
+        Safe to call from sync endpoints running in the threadpool. See publish()
+        for skip_unwatched.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if self.publish_queue is None:
+            if running_loop is None:
+                logger.warning("Redis not connected, dropping message for %s", channel)
+                return
+            asyncio.create_task(self.publish(channel, message, skip_unwatched))
+            return
+
+        entry = (channel, message, skip_unwatched)
+        if running_loop is self.loop:
+            self.publish_queue.put_nowait(entry)
+        else:
+            # asyncio.Queue is not thread-safe
+            self.loop.call_soon_threadsafe(self.publish_queue.put_nowait, entry)
+
+    async def _flush_publishes(self):
+        """Drain the publish queue, sending each batch in one pipeline"""
+        while True:
+            batch = [await self.publish_queue.get()]
+            # Give concurrent handlers a moment to enqueue into the same batch
+            await asyncio.sleep(settings.REDIS_PUBLISH_BATCH_WINDOW)
+            while len(batch) < settings.REDIS_PUBLISH_BATCH_SIZE and not self.publish_queue.empty():
+                batch.append(self.publish_queue.get_nowait())
+            try:
+                await self.publish_many(batch)
+            except Exception:
+                # publish_many already logged it; keep the flusher alive
+                pass
+
+    async def publish_many(self, messages: List[Tuple[str, Any, bool]]):
+        """Publish several (channel, message, skip_unwatched) entries in one pipelined round trip"""
+        if not messages:
+            return
+        try:
+            skippable = {channel for channel, _, skip_unwatched in messages if skip_unwatched}
+            if skippable:
+                counts = await self.subscriber_counts(skippable)
+                messages = [
+                    entry for entry in messages
+                    if not entry[2] or counts[entry[0]]
+                ]
+            if not messages:
+                return
+            async with self.redis_conn.pipeline(transaction=False) as pipe:
+                for channel, message, _ in messages:
+                    message["source_id"] = self.instance_id
+                    pipe.publish(channel, orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS))
+                await pipe.execute()
+            logger.debug("Published %d messages in one pipeline", len(messages))
+        except Exception as e:
+            logger.error("Failed to publish %d messages to Redis: %s", len(messages), str(e), exc_info=True)
+            raise
+    
     async def subscribe(self, channel: str, callback):
         """Subscribe to a Redis channel"""
-        if not self.redis_conn:
-            logger.info("Redis connection not established, connecting now")
+        if not self.pubsub:
+            logger.info("Redis pub/sub not started, connecting now")
             await self.connect()
         
         try:
             logger.debug("Subscribing to Redis channel: %s", channel)
             await self.pubsub.subscribe(**{channel: callback})
+            # Don't let a cached zero hide this subscriber from the next publish
+            self.numsub_cache.pop(channel, None)
         except Exception as e:
             logger.error("Failed to subscribe to Redis channel %s: %s", channel, str(e), exc_info=True)
             raise
 
     async def unsubscribe(self, channel: str):
         """Unsubscribe from a Redis channel"""
-        if not self.redis_conn:
-            logger.warning("Cannot unsubscribe - Redis connection not established")
+        if not self.pubsub:
+            logger.warning("Cannot unsubscribe - Redis pub/sub not started")
             return
             
         try:
@@ -102,13 +243,9 @@ class RedisManager:
 
     async def set(self, key: str, value: Any, ex: Optional[int] = None):
         """Set a key-value pair with optional expiration"""
-        if not self.redis_conn:
-            await self.connect()
-        
         try:
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value)
-            
+            # Everything goes through orjson so get() can hand it back as stored
+            value = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
             if ex:
                 await self.redis_conn.setex(key, ex, value)
             else:
@@ -120,32 +257,38 @@ class RedisManager:
     
     async def get(self, key: str) -> Optional[Any]:
         """Get a value by key, automatically parsing JSON if possible"""
-        if not self.redis_conn:
-            await self.connect()
-        
         try:
             data = await self.redis_conn.get(key)
             if data is None:
                 return None
-            
-            # Decode bytes to string
-            if isinstance(data, bytes):
-                data = data.decode('utf-8')
-            
-            # Try to parse as JSON, fall back to string
+
+            # Try to parse as JSON (orjson takes the raw bytes), fall back to string
             try:
-                return json.loads(data)
-            except (json.JSONDecodeError, TypeError):
-                return data
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                return data.decode('utf-8')
         except Exception as e:
             logger.error(f"Failed to get key {key}: {str(e)}", exc_info=True)
             return None
     
+    async def incr(self, key: str, ex: Optional[int] = None) -> int:
+        """Increment a counter, starting its expiration when it is first created"""
+        try:
+            if not ex:
+                return await self.redis_conn.incr(key)
+            # SET NX creates the key with its TTL only if it is missing, and INCR
+            # keeps that TTL; in one MULTI so the counter can never outlive ex
+            async with self.redis_conn.pipeline(transaction=True) as pipe:
+                pipe.set(key, 0, ex=ex, nx=True)
+                pipe.incr(key)
+                _, value = await pipe.execute()
+            return value
+        except Exception as e:
+            logger.error(f"Failed to increment key {key}: {str(e)}", exc_info=True)
+            raise
+    
     async def keys(self, pattern: str) -> list:
         """Get keys matching a pattern"""
-        if not self.redis_conn:
-            await self.connect()
-        
         try:
             keys = await self.redis_conn.keys(pattern)
             # Decode bytes keys to strings
@@ -156,9 +299,6 @@ class RedisManager:
     
     async def delete(self, *keys: str):
         """Delete one or more keys"""
-        if not self.redis_conn:
-            await self.connect()
-        
         try:
             if keys:
                 await self.redis_conn.delete(*keys)
@@ -169,9 +309,6 @@ class RedisManager:
     
     async def exists(self, key: str) -> bool:
         """Check if a key exists"""
-        if not self.redis_conn:
-            await self.connect()
-        
         try:
             return bool(await self.redis_conn.exists(key))
         except Exception as e:
@@ -6,11 +6,9 @@ from sqlalchemy.orm import Session
 
 from .game_logic import GameService, InvalidMoveError, KoViolationError, SuicideMoveError, MoveResultType
 from .schemas import (
-    WebSocketResponse, 
     WebSocketResponseType, 
     TimeoutMessage, 
-    TimeoutData, 
-    RedisGameUpdate
+    TimeoutData
 )
 from .event_manager import redis_manager, get_game_update_channel
 from .loggers import api_logger as logger
@@ -65,55 +63,52 @@ async def process_game_move(
                     game_id=game_id
                 ))
 
-                redis_message = RedisGameUpdate(
-                    game_id=game_id,
-                    message=timeout_message.dict(),
-                    source_id=None
-                )
-
-                await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+                redis_manager.publish_nowait(get_game_update_channel(game_id), {
+                    "game_id": game_id,
+                    "message": timeout_message.dict()
+                })
 
             return "timeout", {"status": "timeout", "message": result.message}, None
             
         elif result.type == MoveResultType.GAME_OVER:
             logger.info("Game over detected in game %d", game_id)
             
-            game_over_message = WebSocketResponse(
-                type=WebSocketResponseType.GAME_OVER,
-                data=result.game
-            )
-            redis_message = RedisGameUpdate(
-                game_id=game_id,
-                message=game_over_message.dict()            
-            )
-            await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+            # Same shape as WebSocketResponse(...).dict(), without the model round trip
+            game_over_message = {
+                "type": WebSocketResponseType.GAME_OVER,
+                "data": result.game.dict()
+            }
+            redis_manager.publish_nowait(get_game_update_channel(game_id), {
+                "game_id": game_id,
+                "message": game_over_message
+            })
 
             return "game_over", {"status": "game_over", "message": result.message}, None
         
         elif result.type == MoveResultType.PASS:
             logger.info("Pass move detected in game %d", game_id)
-            pass_message = WebSocketResponse(
-                type=WebSocketResponseType.PASS,
-                data=result.game
-            )
-            redis_message = RedisGameUpdate(
-                game_id=game_id,
-                message=pass_message.dict()
-            )
-            await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+            pass_message = {
+                "type": WebSocketResponseType.PASS,
+                "data": result.game.dict()
+            }
+            redis_manager.publish_nowait(get_game_update_channel(game_id), {
+                "game_id": game_id,
+                "message": pass_message
+            })
             return "pass", {"status": "pass", "message": result.message}, None
         
         else:  # SUCCESS case
             logger.debug("Broadcasting move for game %d via Redis", game_id)
-            ws_resp = WebSocketResponse(
-                    type=WebSocketResponseType.GAME_STATE,
-                    data=result.game
-                )
-            redis_message = RedisGameUpdate(
-                game_id=game_id,
-                message=ws_resp.dict()
-            )
-            await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+            ws_resp = {
+                "type": WebSocketResponseType.GAME_STATE,
+                "data": result.game.dict()
+            }
+            # A full state, superseded by the next one, so it can be dropped
+            # when nobody is watching the game
+            redis_manager.publish_nowait(get_game_update_channel(game_id), {
+                "game_id": game_id,
+                "message": ws_resp
+            }, skip_unwatched=True)
             
             logger.info("Move successful for game %d by user %s", game_id, username)
             return "success", {"status": "success"}, None
@@ -126,15 +121,15 @@ async def process_game_move(
                       error_type.replace("_", " ").title(), game_id, username, str(e))
         
         # Get current game state to send back to client
-        current_state = service.get_game(game_id)
-        ws_resp = WebSocketResponse(
-            type=WebSocketResponseType.GAME_STATE,
-            data=current_state
-        )
-        redis_message = RedisGameUpdate(
-            game_id=game_id,
-            message=ws_resp.dict()
-        )
-        await redis_manager.publish(get_game_update_channel(game_id), redis_message.dict())
+        # (as a response model; the bare Game row cannot be serialized)
+        current_state = service.to_response(service.get_game(game_id))
+        ws_resp = {
+            "type": WebSocketResponseType.GAME_STATE,
+            "data": current_state.dict()
+        }
+        redis_manager.publish_nowait(get_game_update_channel(game_id), {
+            "game_id": game_id,
+            "message": ws_resp
+        }, skip_unwatched=True)
 
         return "error", {"status": "error", "message": str(e)}, str(e)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from .models import Game, Move, StoneColor, GameStatus
 from .schemas import GameStateResponse
@@ -30,13 +31,17 @@ class MoveResult:
     player_color: Optional[StoneColor] = None  # For timeout/resignation
     message: Optional[str] = None
 
+# Built once at import; SQLAlchemy's compiled cache then reuses the SQL for every
+# lookup instead of rebuilding the statement per call
+GAME_BY_ID = select(Game).where(Game.id == bindparam("game_id"))
+
 class GameService:
     def __init__(self, db: Session):
         self.db = db
     
     def get_game(self, game_id: int) -> Game:
         logger.debug("Fetching game with ID: %d", game_id)
-        game = self.db.query(Game).filter(Game.id == game_id).first()
+        game = self.db.execute(GAME_BY_ID, {"game_id": game_id}).scalar_one_or_none()
         if not game:
             logger.warning("Game not found: %d", game_id)
             raise Exception("Game not found")
@@ -45,10 +50,10 @@ class GameService:
     def to_response(self, game, player_color: Optional[StoneColor] = None) -> GameStateResponse:
         """Convert internal game state to API response format"""
         logger.debug("Converting game %d to response format", game.id)
-        result = self.get_game_state(game)
+        # Only the board is needed here, so skip get_game_state's last-move query
         return GameStateResponse(
             success=True,
-            board=result["board"],
+            board=self._get_board(game),
             captured=[],
             black_captures=game.black_captures,
             white_captures=game.white_captures,
@@ -58,6 +63,16 @@ class GameService:
             status=game.status,
             move_number=game.move_count
         )
+
+    def _get_board(self, game: Game) -> List[List[int]]:
+        """Get board from game state or create new one"""
+        if game.board_state:
+            return game.board_state
+        logger.debug("Creating new board for game %d with size %d", game.id, game.board_size)
+        board = [[0 for _ in range(game.board_size)] for _ in range(game.board_size)]
+        game.board_state = board
+        return board
+
     def get_game_state(self, game: Game) -> dict:
         """Pure function to compute game state from a game object"""
         logger.debug("Computing game state for game %d", game.id)
@@ -69,13 +84,7 @@ class GameService:
             .first()
         )
 
-        # Get board from game state or create new one
-        if game.board_state:
-            board = game.board_state
-        else:
-            logger.debug("Creating new board for game %d with size %d", game.id, game.board_size)
-            board = [[0 for _ in range(game.board_size)] for _ in range(game.board_size)]
-            game.board_state = board
+        board = self._get_board(game)
 
         if not last_move:
             color = StoneColor.WHITE
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from enum import IntEnum
 from datetime import datetime
 from typing import Optional
@@ -76,7 +77,7 @@ class Game(Base):
     board_state = Column(JSON)  # This will store a 2D array of the current board
     status = Column(Integer, default=GameStatus.ACTIVE)
     created_at = Column(DateTime, default=datetime.utcnow)
-    last_move_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_move_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     move_count = Column(Integer, default=0)
     
     # Time tracking fields
@@ -89,6 +90,15 @@ class Game(Base):
     draw_offered_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     draw_offered_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # A player's game list filters on their seat and status and sorts by
+        # last_move_at; one index per seat lets Postgres OR the two together
+        Index('ix_game_black_player_status_last_move', 'black_player_id', 'status', 'last_move_at'),
+        Index('ix_game_white_player_status_last_move', 'white_player_id', 'status', 'last_move_at'),
+        # The stale-game sweep scans active games by last activity
+        Index('ix_game_status_last_move', 'status', 'last_move_at'),
+    )
+
     def offer_draw(self, player_id: int) -> bool:
         """
         Offer a draw. Returns True if the offer was accepted, False otherwise.
@@ -201,7 +211,7 @@ class User(Base):
     hashed_password = Column(String, nullable=True)
     role = Column(String, default=UserRole.USER)
     is_anonymous = Column(Boolean, default=False)
-    reset_token = Column(String, unique=True, nullable=True, index=True)
+    reset_token = Column(String, nullable=True)
     reset_token_expires = Column(DateTime, nullable=True)
     # Replace single elo_rating with relationship to multiple ratings
     #ratings = relationship("PlayerRating", back_populates="user")
@@ -211,6 +221,12 @@ class User(Base):
     games_as_white = relationship("Game", foreign_keys=[Game.white_player_id], back_populates="white_player")
     auth_providers = relationship("AuthProvider", back_populates="user")
 
+    __table_args__ = (
+        # Only users mid-reset carry a token, so index just those rows
+        Index('uq_users_reset_token', 'reset_token', unique=True,
+              postgresql_where=reset_token.isnot(None)),
+    )
+
 
 class StoneColor(IntEnum):
     BLACK = 1
@@ -230,6 +246,10 @@ class Move(Base):
     captured_positions = Column(JSON)  # Store positions of any stones captured by this move
     is_pass = Column(Boolean, default=False)
 
+    __table_args__ = (
+        Index('ix_move_game_id_move_number', 'game_id', 'move_number'),
+    )
+
 class Challenge(Base):
     __tablename__ = "challenges"
 
@@ -241,6 +261,17 @@ class Challenge(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_anonymous = Column(Boolean, default=False)
 
+    __table_args__ = (
+        # Matchmaking only ever looks at open challenges; the
+        # (board_size, time_control) prefix serves the registered-player lookup
+        # and is_anonymous narrows the anonymous one
+        Index('ix_challenge_match', 'board_size', 'time_control', 'is_anonymous',
+              postgresql_where=text("status = 'open'")),
+        # The stale-challenge sweep deletes open challenges by age
+        Index('ix_challenge_open_created_at', 'created_at',
+              postgresql_where=text("status = 'open'")),
+    )
+
 """
 class PlayerRating(Base):
     __tablename__ = "player_ratings"
@@ -280,12 +311,12 @@ class AuthProvider(Base):
     __tablename__ = "auth_providers"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     provider = Column(String, Enum(AuthProviderType), nullable=False)  # Use the enum
     provider_user_id = Column(String, nullable=False)  # Provider's unique identifier
     provider_email = Column(String, nullable=True)  # Email from the provider
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationship to User
     user = relationship("User", back_populates="auth_providers")
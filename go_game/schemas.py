@@ -197,7 +197,10 @@ class GameSummary(BaseModel):
 
 class GameHistoryResponse(BaseModel):
     games: List[GameSummary]
-    count: int
+    # Only sent on the first page (no cursor)
+    count: Optional[int] = None
+    # Pass back as ?cursor= to fetch the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 class DrawOfferRequest(BaseModel):
     game_id: int
@@ -1,16 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from .background_tasks import cleanup_stale_games
 # Import your routers
 from .api_router import router as api_router
 from .websocket_router import router as ws_router
 from .event_manager import redis_manager
 from .timer_service import timer_service
+from .config import settings
+from .database import warm_up_pool
 
-app = FastAPI(title="Go Game Server")
+# Responses are encoded with orjson, as the Redis and websocket messages already are
+app = FastAPI(title="Go Game Server", default_response_class=ORJSONResponse)
 
 # CORS setup
 app.add_middleware(
@@ -28,6 +33,15 @@ app.include_router(ws_router)
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
+    # Sync endpoints, sync dependencies and asyncio.to_thread all run on the
+    # loop's default executor; size it above the DB pool so threads aren't the
+    # bottleneck
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.THREADPOOL_SIZE, thread_name_prefix="go_game")
+    )
+    # Open the DB pool's connections before traffic arrives
+    await loop.run_in_executor(None, warm_up_pool)
     # Initialize Redis
     await redis_manager.connect()
     await timer_service.start()
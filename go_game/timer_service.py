@@ -3,7 +3,7 @@ import asyncio
 from datetime import datetime
 import json
 from .event_manager import redis_manager, get_game_update_channel
-from .schemas import TimeoutData, TimeoutMessage, RedisGameUpdate
+from .schemas import TimeoutData, TimeoutMessage
 from .models import StoneColor, GameStatus, Game, TimeControl
 from .logging_config import logger
 import socket
@@ -208,7 +208,7 @@ class GameTimerService:
         db = self.db_factory()
         try:
             # Get the game
-            game = db.query(Game).filter(Game.id == game_id).first()
+            game = db.get(Game, game_id)
             
             if not game or game.status != GameStatus.ACTIVE:
                 return
@@ -236,16 +236,15 @@ class GameTimerService:
             )
             
             timeout_message = TimeoutMessage(data=timeout_data)
-                # Create proper Redis message
-            redis_message = RedisGameUpdate(
-                game_id=game_id,
-                message=timeout_message.dict(),
-                source_id=None  # System-generated message
-            )
+            # System-generated message, so no target_id
+            redis_message = {
+                "game_id": game_id,
+                "message": timeout_message.dict(),
+            }
             # Publish to Redis for all workers to broadcast
             await self.redis.publish(
                 get_game_update_channel(game_id),
-                redis_message.dict()
+                redis_message
             )
             
         finally:
@@ -1,10 +1,11 @@
-import json
+import orjson
 import asyncio
+import weakref
 from fastapi import WebSocket
 from typing import Dict, List
 from asyncio import Task, create_task, sleep
 from .models import GameStatus
-from .schemas import PlayerConnectionEvent, PlayerDisconnectedMessage, RedisConnectionEvent, PlayerReconnectedMessage, WebSocketResponse, WebSocketResponseType
+from .schemas import PlayerConnectionEvent, PlayerDisconnectedMessage, PlayerReconnectedMessage, WebSocketResponse, WebSocketResponseType
 from sqlalchemy.orm import Session
 from .game_logic import GameService
 from .config import settings
@@ -23,7 +24,7 @@ class ChallengeConnectionManager:
     
     async def _handle_challenge_update(self, message):
         """Handle challenge updates from Redis"""
-        data = json.loads(message["data"])
+        data = orjson.loads(message["data"])
         challenge_id = data.get("challenge_id")
         if challenge_id and challenge_id in self.active_connections:
             await self.broadcast_to_challenge(challenge_id, data)
@@ -43,8 +44,10 @@ class ChallengeConnectionManager:
 
     async def broadcast_to_challenge(self, challenge_id: str, message: dict):
         if challenge_id in self.active_connections:
+            # Encode once for all connections rather than once per send_json
+            text = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
             for connection in self.active_connections[challenge_id]:
-                await connection.send_json(message)
+                await connection.send_text(text)
 
 
 class ConnectionManager:
@@ -54,6 +57,9 @@ class ConnectionManager:
         self.disconnect_tasks: Dict[str, Task] = {}  # "game_id:player_id" -> task
         self.redis = redis_manager or RedisManager()
         self.subscribed_games = set()  # Track which game channels we're subscribed to
+        # game_id -> lock serializing that game's SUBSCRIBE/UNSUBSCRIBE; an entry
+        # lives only while someone holds or waits on it
+        self.subscription_locks = weakref.WeakValueDictionary()
     
     async def start(self):
         """Start the Redis connection"""
@@ -61,13 +67,19 @@ class ConnectionManager:
         await self.redis.connect()
         logger.info("ConnectionManager startup completed")
     
+    def subscription_lock(self, game_id: int) -> asyncio.Lock:
+        lock = self.subscription_locks.get(game_id)
+        if lock is None:
+            lock = self.subscription_locks[game_id] = asyncio.Lock()
+        return lock
+
     def get_target_id(self, game_id: int, target_id: int):
         return f"{game_id}:{target_id}"
     
     async def _handle_game_update(self, message):
         """Handle game updates from Redis"""
         logger.debug(f"Received game update: {message}")
-        data = json.loads(message["data"])
+        data = orjson.loads(message["data"])
         logger.debug(f"Received game update: {data}")
         game_id = data.get("game_id")
         target_id = data.get("target_id")  # New field for targeted messages
@@ -82,7 +94,7 @@ class ConnectionManager:
     
     async def _handle_game_connection(self, message):
         """Handle connection events from Redis for a specific game"""
-        data = json.loads(message["data"])
+        data = orjson.loads(message["data"])
         action = data.get("action")
         game_id = data.get("game_id")
         source_id = data.get("source_id")
@@ -111,18 +123,20 @@ class ConnectionManager:
         await websocket.accept()
         logger.info(f"Connected to game {game_id} for player {player_id}")
         
-        # Subscribe to game-specific channels if not already subscribed
-        if game_id not in self.subscribed_games:
-            game_update_channel = get_game_update_channel(game_id)
-            game_connection_channel = get_game_connection_channel(game_id)
-            await self.redis.subscribe(game_update_channel, self._handle_game_update)
-            await self.redis.subscribe(game_connection_channel, self._handle_game_connection)
-            self.subscribed_games.add(game_id)
-            logger.info(f"Subscribed to channels for game {game_id}")
+        # Subscribe to game-specific channels if not already subscribed. Under
+        # the game's lock so a concurrent unsubscribe_game can't undo it.
+        async with self.subscription_lock(game_id):
+            if game_id not in self.subscribed_games:
+                game_update_channel = get_game_update_channel(game_id)
+                game_connection_channel = get_game_connection_channel(game_id)
+                await self.redis.subscribe(game_update_channel, self._handle_game_update)
+                await self.redis.subscribe(game_connection_channel, self._handle_game_connection)
+                self.subscribed_games.add(game_id)
+                logger.info(f"Subscribed to channels for game {game_id}")
         
-        if game_id not in self.active_connections:
-            self.active_connections[game_id] = []
-        self.active_connections[game_id].append(websocket)
+            if game_id not in self.active_connections:
+                self.active_connections[game_id] = []
+            self.active_connections[game_id].append(websocket)
         
         # Store player connection and cancel any pending disconnect check
         key = self.get_target_id(game_id, player_id)
@@ -152,17 +166,19 @@ class ConnectionManager:
             )
         )
         
+        payload = disconnect_message.dict()
+
         # Broadcast to other players
-        asyncio.create_task(self.broadcast_to_game(game_id, disconnect_message.dict()))
+        asyncio.create_task(self.broadcast_to_game(game_id, payload))
         
         # Notify Redis about the disconnection - use game-specific channel
-        redis_message = RedisConnectionEvent(
-            action="player_disconnect",
-            game_id=game_id,
-            player_id=player_id,
-            message=disconnect_message.dict()
-        )
-        asyncio.create_task(self.redis.publish(get_game_connection_channel(game_id), redis_message.dict()))
+        redis_message = {
+            "action": "player_disconnect",
+            "game_id": game_id,
+            "player_id": player_id,
+            "message": payload,
+        }
+        asyncio.create_task(self.redis.publish(get_game_connection_channel(game_id), redis_message))
         
         # Schedule disconnect check
         self.schedule_disconnect_check(game_id, player_id, db)
@@ -170,13 +186,17 @@ class ConnectionManager:
     async def send_to_target(self, game_id: int, target_id: int, message: dict):
         key = self.get_target_id(game_id, target_id)
         if key in self.player_game_connections:
-            await self.player_game_connections[key].send_json(message)
+            await self.player_game_connections[key].send_text(
+                orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+            )
 
     async def broadcast_to_game(self, game_id: int, message: dict):
         logger.debug(f"Broadcasting to game {game_id}: {message}")
         if game_id in self.active_connections:
+            # Encode once for all connections rather than once per send_json
+            text = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
             for connection in self.active_connections[game_id]:
-                await connection.send_json(message)
+                await connection.send_text(text)
 
     async def close_game_connections(self, game_id: int):
         """Close all connections for a game"""
@@ -198,8 +218,18 @@ class ConnectionManager:
                 del self.player_game_connections[key]
             
             # Remove from subscribed games
-            if game_id in self.subscribed_games:
-                self.subscribed_games.remove(game_id)
+            await self.unsubscribe_game(game_id)
+
+    async def unsubscribe_game(self, game_id: int):
+        """Drop this instance's Redis subscriptions for a game nobody here is watching"""
+        async with self.subscription_lock(game_id):
+            # Re-check under the lock: a player may have connected meanwhile
+            if game_id not in self.subscribed_games or game_id in self.active_connections:
+                return
+            self.subscribed_games.remove(game_id)
+            await self.redis.unsubscribe(get_game_update_channel(game_id))
+            await self.redis.unsubscribe(get_game_connection_channel(game_id))
+            logger.info(f"Unsubscribed from channels for game {game_id}")
 
     async def handle_disconnect(self, game_id: int, player_id: int, db: Session):
         try:
@@ -211,6 +241,11 @@ class ConnectionManager:
             if key in self.player_game_connections:
                 return  # Player reconnected, no need to abandon game
             
+            # Past the reconnect window with nobody left on this instance, so
+            # stop receiving the game's traffic
+            if game_id not in self.active_connections:
+                await self.unsubscribe_game(game_id)
+            
             # Check if game should be marked as abandoned
             gs = GameService(db)
             game = gs.get_game(game_id)
@@ -267,17 +302,19 @@ class ConnectionManager:
                 )
             )
         
+            payload = reconnect_message.dict()
+
             # Broadcast to other players in this game
-            asyncio.create_task(self.broadcast_to_game(game_id, reconnect_message.dict()))
+            asyncio.create_task(self.broadcast_to_game(game_id, payload))
         
             # Notify other processes about the reconnection - use game-specific channel
-            redis_message = RedisConnectionEvent(
-                action="player_reconnect",
-                game_id=game_id,
-                player_id=player_id,
-                message=reconnect_message.dict()
-            )
-            asyncio.create_task(self.redis.publish(f"game_connections:{game_id}", redis_message.dict()))
+            redis_message = {
+                "action": "player_reconnect",
+                "game_id": game_id,
+                "player_id": player_id,
+                "message": payload,
+            }
+            asyncio.create_task(self.redis.publish(get_game_connection_channel(game_id), redis_message))
 
 # Create instances
 manager = ConnectionManager(redis_manager)
@@ -1,7 +1,8 @@
 import asyncio
+import orjson
 import uvicorn
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from .schemas import WebSocketResponse, WebSocketResponseType, WebSocketRequest, WebSocketRequestType, PongResponse, PingData, MoveData
 from datetime import datetime
 from .game_handlers import process_game_move
@@ -16,6 +17,13 @@ from .loggers import api_logger as logger  # Import the logger
 # Create router instead of app
 router = APIRouter(prefix="/api")  # Optional prefix
 
+# The pong reply never changes, so encode it once
+PONG_TEXT = orjson.dumps(PongResponse().dict()).decode()
+
+async def send_message(websocket: WebSocket, message: dict):
+    """send_json, but encoded with orjson like the Redis broadcasts"""
+    await websocket.send_text(orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode())
+
 @router.on_event("startup")
 async def startup_event():
     logger.info("Starting WebSocket router")
@@ -56,7 +64,7 @@ async def handle_game_socket(websocket: WebSocket,
                 type=WebSocketResponseType.GAME_STATE,
                 data=service.to_response(game)
             )
-            await websocket.send_json(ws_resp.dict())
+            await send_message(websocket, ws_resp.dict())
             await websocket.close()
             return
         
@@ -69,7 +77,7 @@ async def handle_game_socket(websocket: WebSocket,
                 type=WebSocketResponseType.GAME_STATE,
                 data=service.to_response(game)
             )
-            await websocket.send_json(message.dict())
+            await send_message(websocket, message.dict())
             logger.info("Initial game state sent for game %d", game_id)
         except Exception as e:
             logger.error("Error sending initial game state for game %d: %s", game_id, str(e), exc_info=True)
@@ -78,7 +86,7 @@ async def handle_game_socket(websocket: WebSocket,
 
         logger.info("Waiting for disconnect from game %d", game_id)
         while True:
-            raw_request = await websocket.receive_json()  # Just wait for disconnect
+            raw_request = orjson.loads(await websocket.receive_text())  # Just wait for disconnect
             request = WebSocketRequest(**raw_request)
 
             if request.type == WebSocketRequestType.PING:
@@ -93,11 +101,10 @@ async def handle_game_socket(websocket: WebSocket,
                             type=WebSocketResponseType.GAME_STATE,
                             data=service.to_response(game)
                         )
-                        await websocket.send_json(ws_resp.dict())
+                        await send_message(websocket, ws_resp.dict())
 
                     else:
-                        ws_resp = PongResponse()
-                        await websocket.send_json(ws_resp.dict())
+                        await websocket.send_text(PONG_TEXT)
                 except Exception as e:
                     logger.error("Error processing PING request: %s", str(e), exc_info=True)
                 finally:
@@ -148,10 +155,11 @@ async def challenge_status(websocket: WebSocket, challenge_id: int):
             db = next(get_db())
             try:
                 from .schemas import OpenChallengeResponse, ChallengeStatus, StoneColor
-                challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+                challenge = db.get(models.Challenge, challenge_id)
                 
                 if not challenge:
-                    await websocket.send_json(
+                    await send_message(
+                        websocket,
                         OpenChallengeResponse(
                             challenge_id=challenge_id,
                             status="error",
@@ -164,7 +172,8 @@ async def challenge_status(websocket: WebSocket, challenge_id: int):
                 if (datetime.now() - start_time).seconds >= CHALLENGE_TIMEOUT:
                     db.delete(challenge)
                     db.commit()
-                    await websocket.send_json(
+                    await send_message(
+                        websocket,
                         OpenChallengeResponse(
                             challenge_id=challenge_id,
                             status=ChallengeStatus.EXPIRED
@@ -174,14 +183,19 @@ async def challenge_status(websocket: WebSocket, challenge_id: int):
                 
                 logger.debug(f"challenge.status: {challenge.status}")
                 if challenge.status == ChallengeStatus.MATCHED:
-                    game = db.query(models.Game).filter(
+                    # Both player names are logged below; load them with the game
+                    game = db.query(models.Game).options(
+                        joinedload(models.Game.black_player),
+                        joinedload(models.Game.white_player)
+                    ).filter(
                         (models.Game.black_player_id == challenge.challenger_id) |
                         (models.Game.white_player_id == challenge.challenger_id)
                     ).order_by(models.Game.id.desc()).first()
                     
                     logger.info(f"game.black_player_id: {game.black_player_id}, name: {game.black_player.username}")
                     logger.info(f"game.white_player_id: {game.white_player_id}, name: {game.white_player.username}")
-                    await websocket.send_json(
+                    await send_message(
+                        websocket,
                         OpenChallengeResponse(
                             challenge_id=challenge_id,
                             status=ChallengeStatus.MATCHED,
@@ -192,7 +206,8 @@ async def challenge_status(websocket: WebSocket, challenge_id: int):
                     break
                 elif last_sent_status != ChallengeStatus.WAITING:
                         logger.info(f"Sending WAITING status for challenge {challenge.id}")
-                        await websocket.send_json(
+                        await send_message(
+                            websocket,
                             OpenChallengeResponse(
                                 challenge_id=challenge_id,
                                 status=ChallengeStatus.WAITING
@@ -209,7 +224,7 @@ async def challenge_status(websocket: WebSocket, challenge_id: int):
         # Cleanup on websocket disconnect
         db = next(get_db())
         try:
-            challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+            challenge = db.get(models.Challenge, challenge_id)
             if challenge and challenge.status == "open":
                 db.delete(challenge)
                 db.commit()
@@ -141,13 +141,11 @@ async def reset_manager():
     
     challenge_manager.active_connections = {}
     
-    # Reset Redis if connected
-    if hasattr(redis_manager, 'redis_conn') and redis_manager.redis_conn:
+    # Reset Redis if connected; disconnect() clears the pool and connection so
+    # the next connect() builds them on this test's event loop
+    if redis_manager.redis_conn:
         print("disconnecting redis", flush=True)
         await redis_manager.disconnect()
-    redis_manager.redis_conn = None
-    redis_manager.pubsub = None
-    redis_manager.listener_task = None
 
 @pytest.fixture(autouse=True)
 async def cleanup_websocket_manager():
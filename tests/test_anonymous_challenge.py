@@ -0,0 +1,26 @@
+from go_game.models import Challenge, TimeControl, User
+
+def test_anonymous_challenge_waits_without_open_opponent(db, test_client):
+    """With nothing to match, the anonymous player and an open challenge are created"""
+    response = test_client.post(
+        "/anonymous/challenge", json={"board_size": 9, "time_control": TimeControl.BLITZ}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "waiting"
+    assert body["color"] == "black"
+
+    db.expire_all()
+    challenge = db.get(Challenge, body["challenge_id"])
+    assert challenge is not None
+    assert challenge.challenger_id == body["player_id"]
+    assert challenge.status == "open"
+    assert challenge.is_anonymous
+    assert challenge.board_size == 9
+    assert challenge.time_control == TimeControl.BLITZ
+    assert challenge.created_at is not None
+
+    player = db.get(User, body["player_id"])
+    assert player.is_anonymous
+    assert player.username.startswith("anonymous_")
+    assert player.role == "user"
@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timedelta
+from go_game.background_tasks import end_stale_games
+from go_game.models import Game, GameStatus, StoneColor, TimeControl
+
+def make_blitz_game(db, black, white, now, black_used, idle_seconds):
+    # Odd move_count: black to move
+    game = Game(
+        black_player_id=black.id,
+        white_player_id=white.id,
+        board_size=9,
+        time_control=TimeControl.BLITZ,
+        status=GameStatus.ACTIVE,
+        move_count=1,
+        black_time_remaining=black_used,
+        white_time_remaining=0,
+        created_at=now - timedelta(minutes=6),
+        last_move_at=now - timedelta(seconds=idle_seconds),
+    )
+    db.add(game)
+    db.commit()
+    return game
+
+def test_end_stale_games_keeps_live_blitz_game(db, test_user, test_opponent):
+    """Used 60s and thinking for 61s is well inside a 300s blitz clock"""
+    now = datetime.utcnow()
+    game = make_blitz_game(db, test_user, test_opponent, now, black_used=60, idle_seconds=61)
+
+    timed_out = end_stale_games(db, now)
+    db.commit()
+
+    assert timed_out == []
+    db.refresh(game)
+    assert game.status == GameStatus.ACTIVE
+
+def test_end_stale_games_times_out_player_out_of_clock(db, test_user, test_opponent):
+    """Used 250s plus 60s idle runs past the 300s blitz clock"""
+    now = datetime.utcnow()
+    game = make_blitz_game(db, test_user, test_opponent, now, black_used=250, idle_seconds=60)
+
+    timed_out = end_stale_games(db, now)
+    db.commit()
+
+    assert [game_id for game_id, _ in timed_out] == [game.id]
+    assert timed_out[0][1]["data"]["timeout_player"] == StoneColor.BLACK
+    db.refresh(game)
+    assert game.status == GameStatus.WHITE_WON_TIMEOUT
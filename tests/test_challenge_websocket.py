@@ -5,6 +5,7 @@ from go_game.models import Game
 from datetime import timedelta
 from go_game.auth import create_access_token
 import time
+from utils import mock_redis_client
 
 @pytest.fixture
 def test_challenge(db, test_user):
@@ -25,14 +26,8 @@ def test_challenge(db, test_user):
 # Mock Redis for testing
 @pytest.fixture(autouse=True)
 def mock_redis():
-    with patch('go_game.websocket_manager.redis.from_url') as mock:
-        # Create a mock Redis client
-        mock_redis_client = MagicMock()
-        mock_redis_client.publish = MagicMock()
-        mock_redis_client.pubsub.return_value.subscribe = MagicMock()
-        mock_redis_client.pubsub.return_value.run = MagicMock()
-        mock.return_value = mock_redis_client
-        yield mock
+    with mock_redis_client() as client:
+        yield client
 
 def test_challenge_timeout(db, test_client, test_challenge, test_user):
     """Test that a challenge times out after the specified period."""
@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime
+from go_game.models import Game, GameStatus
+from go_game.auth import create_access_token
+
+@pytest.fixture
+def finished_games(db, test_user, test_opponent):
+    # Games timed out in one stale-game sweep all share the same last_move_at
+    finished_at = datetime(2025, 4, 20, 12, 0, 0)
+    games = [
+        Game(
+            black_player_id=test_user.id,
+            white_player_id=test_opponent.id,
+            board_size=9,
+            status=GameStatus.WHITE_WON_TIMEOUT,
+            last_move_at=finished_at,
+        )
+        for _ in range(5)
+    ]
+    db.add_all(games)
+    db.commit()
+    return games
+
+def test_game_list_cursor_pages_across_ties(db, test_client, test_user, finished_games):
+    """Keyset pages neither skip nor repeat games that share a last_move_at"""
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': test_user.username})}"}
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = test_client.get("/games", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        # The total is only counted on the first page
+        assert page["count"] == (len(finished_games) if cursor is None else None)
+        seen.extend(game["id"] for game in page["games"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(game.id for game in finished_games)
+    assert len(seen) == len(set(seen))
+
+def test_game_list_rejects_malformed_cursor(db, test_client, test_user):
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': test_user.username})}"}
+    response = test_client.get("/games", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
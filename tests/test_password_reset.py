@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import patch
+from go_game.config import settings
+
+@pytest.fixture
+def rate_counter():
+    """Stand in for Redis INCR so the limiter can be exercised without a server"""
+    counts = {}
+
+    async def incr(key, ex=None):
+        counts[key] = counts.get(key, 0) + 1
+        return counts[key]
+
+    with patch('go_game.api_router.redis_manager.incr', side_effect=incr):
+        yield counts
+
+def test_password_reset_rate_limited_per_client_and_email(db, test_client, rate_counter):
+    """The (N+1)th reset request for one email from one client gets a 429"""
+    headers = {"X-Forwarded-For": "203.0.113.7"}
+    payload = {"email": "Nobody@Example.com"}
+
+    for _ in range(settings.PASSWORD_RESET_RATE_LIMIT):
+        response = test_client.post("/forgot-password/request", json=payload, headers=headers)
+        assert response.status_code == 200
+
+    response = test_client.post("/forgot-password/request", json=payload, headers=headers)
+    assert response.status_code == 429
+
+    # Same email normalised, so the case change doesn't reset the budget
+    response = test_client.post(
+        "/forgot-password/request", json={"email": "nobody@example.com"}, headers=headers
+    )
+    assert response.status_code == 429
+
+    # Another client behind the same proxy keeps its own budget
+    response = test_client.post(
+        "/forgot-password/request", json=payload, headers={"X-Forwarded-For": "198.51.100.2"}
+    )
+    assert response.status_code == 200
+
+    # As does another email from the same client
+    response = test_client.post(
+        "/forgot-password/request", json={"email": "someone@example.com"}, headers=headers
+    )
+    assert response.status_code == 200
+
+def test_password_reset_allowed_when_rate_limit_store_is_down(db, test_client):
+    """A Redis outage lets reset requests through instead of failing them with 500"""
+    with patch('go_game.api_router.redis_manager.incr', side_effect=ConnectionError("redis down")):
+        response = test_client.post("/forgot-password/request", json={"email": "nobody@example.com"})
+    assert response.status_code == 200
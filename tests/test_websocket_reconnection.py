@@ -7,6 +7,7 @@ from go_game.server import app
 from go_game.models import User, Game, GameStatus, StoneColor
 from go_game.websocket_manager import manager
 from go_game.auth import create_access_token
+from utils import mock_redis_client
 
 @pytest.fixture
 def test_game(db, test_user, test_opponent):
@@ -29,19 +30,8 @@ def access_token(test_user):
 # Mock Redis for testing
 @pytest.fixture(autouse=True)
 def mock_redis():
-    with patch('go_game.websocket_manager.redis.from_url') as mock:
-        # Create a mock Redis client
-        mock_redis_client = MagicMock()
-        mock_redis_client.publish = AsyncMock()
-        mock_redis_client.pubsub.return_value.subscribe = AsyncMock()
-        mock_redis_client.pubsub.return_value.run = AsyncMock()
-        
-        # Make from_url return the mock client as a coroutine
-        async def mock_from_url(*args, **kwargs):
-            return mock_redis_client
-        
-        mock.side_effect = mock_from_url
-        yield mock
+    with mock_redis_client() as client:
+        yield client
 
 original_sleep = asyncio.sleep
 # Patch the sleep function to speed up tests
@@ -232,6 +222,43 @@ async def test_multiple_reconnects(db, test_client, test_game, test_user, access
         # Verify game was not abandoned
         assert mock_game.status == GameStatus.ACTIVE 
 
+@pytest.mark.asyncio
+async def test_reconnect_during_unsubscribe_keeps_subscription():
+    """A player connecting while handle_disconnect unsubscribes ends up subscribed"""
+    from go_game.websocket_manager import ConnectionManager
+    from go_game.event_manager import get_game_update_channel, get_game_connection_channel
+
+    redis_calls = []
+
+    async def subscribe(channel, callback):
+        redis_calls.append(("subscribe", channel))
+        await asyncio.sleep(0)
+
+    async def unsubscribe(channel):
+        redis_calls.append(("unsubscribe", channel))
+        await asyncio.sleep(0)
+
+    fake_redis = MagicMock()
+    fake_redis.subscribe = AsyncMock(side_effect=subscribe)
+    fake_redis.unsubscribe = AsyncMock(side_effect=unsubscribe)
+    connection_manager = ConnectionManager(fake_redis)
+
+    # The first player connected and has since left this instance
+    await connection_manager.connect(AsyncMock(), 1, 10)
+    del connection_manager.active_connections[1]
+    del connection_manager.player_game_connections["1:10"]
+
+    with patch('go_game.websocket_manager.sleep', AsyncMock()):
+        disconnect_check = asyncio.create_task(connection_manager.handle_disconnect(1, 10, MagicMock()))
+        await asyncio.sleep(0)  # let it get into the first UNSUBSCRIBE
+        await connection_manager.connect(AsyncMock(), 1, 20)
+        await disconnect_check
+
+    assert 1 in connection_manager.subscribed_games
+    for channel in (get_game_update_channel(1), get_game_connection_channel(1)):
+        last_action = [action for action, name in redis_calls if name == channel][-1]
+        assert last_action == "subscribe"
+
 if __name__ == "__main__":
     import sys
     
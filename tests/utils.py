@@ -1,4 +1,6 @@
 import asyncio
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock, AsyncMock
 from go_game.websocket_manager import manager, challenge_manager, redis_manager
 
 async def reset_websocket_manager():
@@ -14,9 +16,27 @@ async def reset_websocket_manager():
     
     challenge_manager.active_connections = {}
     
-    # Reset Redis connection
+    # Reset Redis connection; disconnect() clears the pool and connection too
     if redis_manager.redis_conn:
         await redis_manager.disconnect()
-    redis_manager.redis_conn = None
-    redis_manager.pubsub = None
-    redis_manager.listener_task = None 
\ No newline at end of file
+
+@contextmanager
+def mock_redis_client():
+    """Patch the pool and client RedisManager.connect() builds; yields the client"""
+    client = MagicMock()
+    client.ping = AsyncMock()
+    client.publish = AsyncMock()
+    client.pubsub.return_value.subscribe = AsyncMock()
+    client.pubsub.return_value.unsubscribe = AsyncMock()
+    client.pubsub.return_value.run = AsyncMock()
+    client.pubsub.return_value.close = AsyncMock()
+
+    # Nobody else is listening, so publishes are skipped
+    async def pubsub_numsub(*channels):
+        return [(channel, 0) for channel in channels]
+    client.pubsub_numsub = AsyncMock(side_effect=pubsub_numsub)
+
+    with patch('go_game.event_manager.redis.BlockingConnectionPool.from_url') as from_url, \
+            patch('go_game.event_manager.redis.Redis', return_value=client):
+        from_url.return_value.disconnect = AsyncMock()
+        yield client 